@@ -12,6 +12,7 @@ from app.api.endpoints.auth import get_current_user
 from app.db.models import User
 from app.audit.models import AuditLog, DataRetentionPolicy
 from app.audit.logger import HIPAAAuditLogger
+from app.audit.queries import get_audit_logs as query_audit_logs
 from app.services.data_retention import get_retention_service
 from app.security.permissions import Role, has_permission, Permission
 
@@ -37,25 +38,16 @@ def get_audit_logs(
 ):
     """Get audit logs for compliance reporting"""
     
-    query = db.query(AuditLog)
-    
-    # Apply filters
-    if username:
-        query = query.filter(AuditLog.username.ilike(f"%{username}%"))
-    if action_type:
-        query = query.filter(AuditLog.action_type == action_type.upper())
-    if resource_type:
-        query = query.filter(AuditLog.resource_type == resource_type.lower())
-    if patient_id:
-        query = query.filter(AuditLog.patient_id == patient_id)
-    if success_only is not None:
-        query = query.filter(AuditLog.success == success_only)
-    
-    # Order by most recent first
-    query = query.order_by(AuditLog.created_at.desc())
-    
-    # Apply pagination
-    audit_logs = query.offset(skip).limit(limit).all()
+    audit_logs = query_audit_logs(
+        db,
+        skip=skip,
+        limit=limit,
+        username=username,
+        action_type=action_type,
+        resource_type=resource_type,
+        patient_id=patient_id,
+        success_only=success_only,
+    )
     
     # Log this admin access
     HIPAAAuditLogger.log_action(
@@ -15,7 +15,7 @@ router = APIRouter(prefix="/audio-retention", tags=["audio-retention"])
 @router.post("/schedule-deletion/{note_id}")
 async def schedule_audio_deletion(
     note_id: int,
-    retention_days: int = Query(30, description="Number of days to retain audio file"),
+    retention_days: int = Query(30, ge=0, le=32767, description="Number of days to retain audio file"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
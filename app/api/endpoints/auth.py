@@ -61,10 +61,14 @@ def get_current_user(request: Request, token: Optional[str] = Depends(oauth2_sch
             logger.warning("No token provided in request")
             raise credentials_exception
         payload = None
-        try:
-            payload = jwt.decode(active_token, SECRET_KEY, algorithms=[ALGORITHM])
-        except JWTError:
-            payload = _verify_clerk_token(active_token)
+        # Reuse claims already decoded by SessionTimeoutMiddleware for this token
+        if getattr(request.state, "jwt_token", None) == active_token:
+            payload = getattr(request.state, "jwt_claims", None)
+        if payload is None:
+            try:
+                payload = jwt.decode(active_token, SECRET_KEY, algorithms=[ALGORITHM])
+            except JWTError:
+                payload = _verify_clerk_token(active_token)
 
         if not payload:
             logger.warning("JWT decode failed for both local and Clerk tokens")
@@ -88,6 +92,8 @@ def get_current_user(request: Request, token: Optional[str] = Depends(oauth2_sch
     if user is None:
         logger.warning(f"User '{username}' not found after token validation")
         raise credentials_exception
+    # Attributes flush-time audit rows for this request's session to the caller
+    db.info["audit_user"] = (user.id, user.username)
     return user
 
 
@@ -149,14 +155,15 @@ def _provision_clerk_user(db: Session, payload: dict) -> Optional[models.User]:
     if existing_email:
         return existing_email
 
-    hashed_password = crud_notes.get_password_hash(secrets.token_urlsafe(32))
+    # Random placeholder nobody knows; an HMAC hash avoids a bcrypt round on first sign-in
+    hashed_password = crud_notes.hash_api_key(secrets.token_urlsafe(32))
     new_user = models.User(
         username=username,
         email=email,
         hashed_password=hashed_password,
         tenant_id="default",
-        is_active=1,
-        is_admin=0,
+        is_active=True,
+        is_admin=False,
         role="provider",
     )
     db.add(new_user)
@@ -400,7 +407,7 @@ def request_password_reset(
     """Request password reset via email verification"""
     try:
         # Find user by email
-        user = db.query(models.User).filter(models.User.email == request_data.email).first()
+        user = db.query(models.User).filter(func.lower(models.User.email) == request_data.email.strip().lower()).first()
         
         # Always return success message for security (don't reveal if email exists)
         success_message = "If an account with that email exists, a password reset link has been sent."
@@ -498,6 +505,7 @@ def verify_password_reset(
         
         # Update password
         new_hashed_password = crud_notes.get_password_hash(request_data.new_password)
+        crud_notes.forget_verified_password(user.hashed_password)
         user.hashed_password = new_hashed_password
         
         # Mark token as used
@@ -551,6 +559,7 @@ def change_password(
         
         # Update password
         new_hashed_password = crud_notes.get_password_hash(request_data.new_password)
+        crud_notes.forget_verified_password(current_user.hashed_password)
         current_user.hashed_password = new_hashed_password
         
         # Log the password change
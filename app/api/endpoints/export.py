@@ -3,7 +3,7 @@ Export endpoints for user data download
 """
 from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer_group
 from app.db.database import get_db
 from app.api.endpoints.auth import get_current_user
 from app.db import models
@@ -92,7 +92,7 @@ async def _get_user_data(user_id: int, db: Session):
     patients = db.query(models.Patient).filter(models.Patient.user_id == user_id).all()
     
     # Get user's notes
-    notes = db.query(models.Note).filter(models.Note.provider_id == user_id).all()
+    notes = db.query(models.Note).options(undefer_group("body")).filter(models.Note.provider_id == user_id).all()
     
     # Get user's appointments
     appointments = []
@@ -197,11 +197,11 @@ async def _get_user_data(user_id: int, db: Session):
         "audit_logs": [
             {
                 "id": log.id,
-                "action": log.action,
+                "action": log.action_type,
                 "resource_type": log.resource_type,
                 "resource_id": log.resource_id,
-                "details": log.details,
-                "ip_address": log.ip_address,
+                "details": log.description,
+                "ip_address": log.user_ip,
                 "user_agent": log.user_agent,
                 "created_at": log.created_at.isoformat()
             }
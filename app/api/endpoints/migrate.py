@@ -2,10 +2,10 @@
 Migration endpoint for database schema updates
 """
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
 import os
-from app.db.database import get_db
+from app.db.database import engine, get_db
 from sqlalchemy.orm import Session
 from app.config import settings
 
@@ -18,14 +18,11 @@ async def migrate_database(db: Session = Depends(get_db)):
     This endpoint should only be called once to fix the schema.
     """
     try:
-        # Get database URL from environment/settings (normalizes postgres:// for SQLAlchemy)
-        database_url = settings.get_database_url()
-        if not database_url:
+        # The application's engine: a per-call create_engine would open a second pool
+        # against the same database and never dispose of it
+        if not settings.get_database_url():
             raise HTTPException(status_code=500, detail="DATABASE_URL not configured")
         
-        # Create engine for direct SQL execution
-        engine = create_engine(database_url)
-        
         # SQL commands to add missing columns
         migrations = [
             "ALTER TABLE users ADD COLUMN IF NOT EXISTS role VARCHAR DEFAULT 'provider';",
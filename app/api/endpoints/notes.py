@@ -13,6 +13,7 @@ from app.services.preferences import load_user_preferences
 from typing import List, Optional
 from datetime import datetime, timezone
 from pathlib import Path
+import base64
 import io
 import difflib
 import os
@@ -42,20 +43,10 @@ def create_note_json(
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    # Force provider_id to current user
-    data = payload.model_dump()
-    data["provider_id"] = current_user.id
-    # Ensure visit_id
-    if not data.get("visit_id"):
-        data["visit_id"] = crud_notes.generate_visit_id(db, data["patient_id"])
-    # Create note
-    note = models.Note(**data)
-    note.created_at = datetime.utcnow()
-    note.updated_at = datetime.utcnow()
-    db.add(note)
-    db.commit()
-    db.refresh(note)
-    return note
+    # Force provider_id to current user; visit_id, if missing, is computed by the INSERT itself
+    # and returned with the row, so there is no refresh afterwards
+    payload = payload.model_copy(update={"provider_id": current_user.id})
+    return crud_notes.create_note(db, payload)
 
 # POST /notes/ - Create a new note for the authenticated provider.
 # Now supports optional audio file upload (multipart/form-data).
@@ -125,10 +116,6 @@ async def create_note(
     if not content.strip() and not audio_file_path:
         raise HTTPException(status_code=400, detail="Note must have either content or audio file")
     
-    # Auto-generate visit_id if not provided, before validation
-    if not visit_id:
-        visit_id = crud_notes.generate_visit_id(db, patient_id)
-    
     # Handle timezone-aware timestamps
     import pytz
     if client_timezone:
@@ -149,7 +136,7 @@ async def create_note(
     note_data = {
         "patient_id": patient_id,
         "provider_id": current_user.id,
-        "visit_id": visit_id,  # Now guaranteed to be a valid integer
+        "visit_id": visit_id or None,  # Auto-generated by the INSERT below if not provided
         "note_type": note_type,
         "content": content,
         "status": status,
@@ -159,23 +146,20 @@ async def create_note(
     
     try:
         note_create = schemas.NoteCreate(**note_data)
-        # Create the note directly since visit_id is already generated
-        db_note = models.Note(**note_create.model_dump())
-        
-        # Override the timestamps with timezone-aware ones
-        db_note.created_at = local_time.astimezone(pytz.UTC)  # Store in UTC but preserve timezone info
-        db_note.updated_at = local_time.astimezone(pytz.UTC)
-        
-        # Set initial accuracy tracking
-        db_note.original_content = content  # Store original AI-generated content
-        db_note.accuracy_score = 100.0  # Start at 100% accuracy
-        db_note.content_changes_count = 0  # No changes yet
-        
-        db.add(db_note)
-        db.commit()
-        db.refresh(db_note)
+        utc_time = local_time.astimezone(pytz.UTC)  # Store in UTC but preserve timezone info
+        db_note = crud_notes.create_note(
+            db,
+            note_create,
+            created_at=utc_time,
+            updated_at=utc_time,
+            # Initial accuracy tracking
+            original_content=content,  # Store original AI-generated content
+            accuracy_score=100.0,  # Start at 100% accuracy
+            content_changes_count=0,  # No changes yet
+        )
         return db_note
     except Exception as e:
+        db.rollback()
         # Log the actual error for debugging
         print(f"Note creation error: {str(e)}")
         print(f"Note data: {note_data}")
@@ -187,15 +171,32 @@ async def create_note(
         else:
             raise HTTPException(status_code=422, detail=f"Database error: {str(e)}")
 
-# GET /notes/ - Retrieve a list of notes for the authenticated provider.
+def _encode_note_cursor(note: models.Note) -> str:
+    """Opaque, URL-safe keyset cursor; a raw ISO timestamp's "+00:00" would arrive as a space if echoed back unencoded"""
+    raw = f"{note.id}:{note.created_at.isoformat()}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_note_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        note_id, created_at = raw.split(":", 1)
+        return datetime.fromisoformat(created_at), int(note_id)
+    except ValueError:  # binascii.Error and UnicodeDecodeError are ValueErrors too
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# GET /notes/ - Retrieve a list of notes for the authenticated provider, newest first.
 # Supports filtering by patient_id, visit_id, note_type, status, and date range.
+# Full pages carry an X-Next-Cursor header; pass it back as ?cursor= for the next page
+# (keyset pagination). skip still works but gets slower the deeper the page.
 # Returns audio_file field if present.
 # Requires authentication.
 @router.get("/", response_model=List[schemas.NoteRead])
 @router.get("", response_model=List[schemas.NoteRead], include_in_schema=False)
 def read_notes(
+    response: Response,
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = Query(None),
     patient_id: Optional[int] = Query(None),
     visit_id: Optional[int] = Query(None),
     note_type: Optional[str] = Query(None),
@@ -205,7 +206,7 @@ def read_notes(
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    return crud_notes.get_notes(
+    notes = crud_notes.get_notes(
         db,
         skip=skip,
         limit=limit,
@@ -216,19 +217,23 @@ def read_notes(
         status=status,
         created_from=created_from,
         created_to=created_to,
+        before=_decode_note_cursor(cursor) if cursor else None,
     )
+    if notes and len(notes) == limit:
+        response.headers["X-Next-Cursor"] = _encode_note_cursor(notes[-1])
+    return notes
 
 # GET /notes/{note_id} - Retrieve a specific note by ID for the authenticated provider.
 # Returns audio_file field if present.
 # Requires authentication.
 @router.get("/{note_id}", response_model=schemas.NoteWithPatientInfo)
 def read_note(note_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    db_note = crud_notes.get_note(db, note_id)
+    db_note = crud_notes.get_note(db, note_id, with_patient=True, with_body=True)
     if db_note is None or db_note.provider_id != current_user.id:
         raise HTTPException(status_code=404, detail="Note not found")
     
-    # Get patient information
-    patient = crud_patients.get_patient_by_id(db, db_note.patient_id)
+    # Patient information (loaded with the note)
+    patient = db_note.patient
     
     # Create enhanced response with patient info
     # Load related comments/history for richer UI
@@ -264,7 +269,7 @@ def export_note_ccd(
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    db_note = crud_notes.get_note(db, note_id)
+    db_note = crud_notes.get_note(db, note_id, with_body=True)
     if db_note is None or db_note.provider_id != current_user.id:
         raise HTTPException(status_code=404, detail="Note not found")
     patient = crud_patients.get_patient_by_id(db, db_note.patient_id)
@@ -337,7 +342,7 @@ def export_note_plain(
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    db_note = crud_notes.get_note(db, note_id)
+    db_note = crud_notes.get_note(db, note_id, with_body=True)
     if db_note is None or db_note.provider_id != current_user.id:
         raise HTTPException(status_code=404, detail="Note not found")
     patient = crud_patients.get_patient_by_id(db, db_note.patient_id)
@@ -379,7 +384,7 @@ def export_note_pdf(
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    db_note = crud_notes.get_note(db, note_id)
+    db_note = crud_notes.get_note(db, note_id, with_body=True)
     if db_note is None or db_note.provider_id != current_user.id:
         raise HTTPException(status_code=404, detail="Note not found")
     patient = crud_patients.get_patient_by_id(db, db_note.patient_id)
@@ -676,7 +681,8 @@ def update_note(note_id: int, note: schemas.NoteUpdate, db: Session = Depends(ge
             summary=", ".join(changed_fields) or "Updated note",
         )
         db.add(hist)
-        db.commit()
+        # db_note was just loaded by UPDATE ... RETURNING; don't expire it for the response
+        crud_notes.commit_keep_loaded(db)
     except Exception:
         db.rollback()
     return db_note
@@ -713,9 +719,9 @@ def get_note_history(note_id: int, db: Session = Depends(get_db), current_user=D
             "id": log.id,
             "note_id": note_id,
             "user_id": log.user_id,
-            "username": log.user.username,
-            "action": log.action,
-            "summary": log.summary,
+            "username": log.username,  # snapshot column; no per-row User lookup
+            "action": log.action_type,
+            "summary": log.description,
             "created_at": log.created_at.isoformat()
         }
         for log in audit_logs
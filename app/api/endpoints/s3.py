@@ -2,12 +2,13 @@
 S3 management endpoints for file operations
 """
 from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, load_only
 from app.services.s3_service import s3_service
 from app.api.endpoints.auth import get_current_user
 from app.db.database import get_db
 from app.db.models import Note
+from app.crud import notes as crud_notes
 from typing import List, Optional
 import logging
 
@@ -27,7 +28,9 @@ async def list_user_files(
     
     try:
         # Get notes with S3 files for the current user
-        notes = db.query(Note).filter(
+        notes = db.query(Note).options(load_only(
+            Note.id, Note.audio_file, Note.s3_key, Note.file_size, Note.content_type, Note.created_at
+        )).filter(
             Note.provider_id == current_user.id,
             Note.s3_key.isnot(None)
         ).offset(offset).limit(limit).all()
@@ -45,12 +48,12 @@ async def list_user_files(
             }
             files.append(file_info)
         
-        return JSONResponse(content={
+        return {
             "files": files,
             "total": len(files),
             "limit": limit,
             "offset": offset
-        })
+        }
     
     except Exception as e:
         logger.error(f"Failed to list S3 files: {e}")
@@ -67,11 +70,8 @@ async def delete_s3_file(
         raise HTTPException(status_code=503, detail="S3 service not available")
     
     try:
-        # Get the note and verify ownership
-        note = db.query(Note).filter(
-            Note.id == note_id,
-            Note.provider_id == current_user.id
-        ).first()
+        # Get the note and verify ownership (only the storage columns)
+        note = crud_notes.get_owned_note_storage(db, note_id, current_user.id)
         
         if not note:
             raise HTTPException(status_code=404, detail="Note not found")
@@ -79,16 +79,24 @@ async def delete_s3_file(
         if not note.s3_key:
             raise HTTPException(status_code=400, detail="Note has no S3 file")
         
-        # Delete from S3
-        if await s3_service.delete_file(note.s3_key):
-            # Update database record
-            note.s3_key = None
-            note.storage_provider = "local"
-            db.commit()
-            
-            return JSONResponse(content={"message": "File deleted successfully"})
-        else:
+        s3_key = note.s3_key
+        user_id = current_user.id
+        # Hand the connection back to the pool before waiting on S3 network I/O
+        db.close()
+        
+        if not await s3_service.delete_file(s3_key):
             raise HTTPException(status_code=500, detail="Failed to delete file from S3")
+        
+        # The session checks out a fresh connection for the single UPDATE statement
+        def clear_s3_reference():
+            db.query(Note).filter(
+                Note.id == note_id,
+                Note.provider_id == user_id
+            ).update({"s3_key": None, "storage_provider": "local"}, synchronize_session=False)
+            db.commit()
+        
+        await run_in_threadpool(clear_s3_reference)
+        return {"message": "File deleted successfully"}
     
     except HTTPException:
         raise
@@ -108,11 +116,8 @@ async def get_download_url(
         raise HTTPException(status_code=503, detail="S3 service not available")
     
     try:
-        # Get the note and verify ownership
-        note = db.query(Note).filter(
-            Note.id == note_id,
-            Note.provider_id == current_user.id
-        ).first()
+        # Get the note and verify ownership (only the storage columns)
+        note = crud_notes.get_owned_note_storage(db, note_id, current_user.id)
         
         if not note:
             raise HTTPException(status_code=404, detail="Note not found")
@@ -126,11 +131,11 @@ async def get_download_url(
         if not download_url:
             raise HTTPException(status_code=500, detail="Failed to generate download URL")
         
-        return JSONResponse(content={
+        return {
             "download_url": download_url,
             "expires_in": expires_in,
             "filename": note.audio_file
-        })
+        }
     
     except HTTPException:
         raise
@@ -141,7 +146,7 @@ async def get_download_url(
 @router.get("/status")
 async def get_s3_status():
     """Get S3 service status"""
-    return JSONResponse(content={
+    return {
         "available": s3_service.is_available(),
         "bucket_name": s3_service.bucket_name if s3_service.is_available() else None
-    }) 
\ No newline at end of file
+    }
\ No newline at end of file
@@ -3,10 +3,11 @@ Simple auth endpoint that works without complex database structure.
 This provides a temporary working auth system.
 """
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.db.database import get_db
-import hashlib
+from app.crud.notes import verify_password
 import jwt
 from datetime import datetime, timedelta
 from app.config import settings
@@ -14,21 +15,33 @@ from app.config import settings
 router = APIRouter()
 
 # Simple in-memory user storage (temporary)
+# Passwords are stored as bcrypt hashes (cost 12) of the documented test passwords
 SIMPLE_USERS = {
     "testuser": {
-        "password": "testpass123",
+        "password_hash": "$2b$12$OyUfJgc4veNygq.TVDao4e5bDyhfbwckl61cgUbPniHQ9JgUHUuby",
         "email": "test@example.com",
         "is_active": True,
         "is_admin": False
     },
     "admin": {
-        "password": "admin123",
+        "password_hash": "$2b$12$cKAnf2lEzxROX6qQgmobsuiuxFkdgwDX8cTfyBfUx8L2D3PJeR8zS",
         "email": "admin@example.com", 
         "is_active": True,
         "is_admin": True
     }
 }
 
+# Hash checked for unknown usernames so response timing doesn't reveal which users exist
+_DUMMY_HASH = SIMPLE_USERS["testuser"]["password_hash"]
+
+async def verify_simple_user(username: str, password: str) -> bool:
+    """Check a username/password pair against SIMPLE_USERS without blocking the event loop"""
+    user = SIMPLE_USERS.get(username)
+    password_hash = user["password_hash"] if user else _DUMMY_HASH
+    # verify_password answers repeat logins from its HMAC fast tier without running bcrypt
+    verified = await run_in_threadpool(verify_password, password, password_hash)
+    return bool(verified and user)
+
 def create_access_token(data: dict):
     """Create a simple JWT token"""
     to_encode = data.copy()
@@ -46,16 +59,12 @@ async def simple_login(form_data: OAuth2PasswordRequestForm = Depends()):
     username = form_data.username
     password = form_data.password
     
-    # Check if user exists in simple storage
-    if username not in SIMPLE_USERS:
+    # Constant-time bcrypt check (unknown users are verified against a dummy hash)
+    if not await verify_simple_user(username, password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     user = SIMPLE_USERS[username]
     
-    # Simple password check (in production, use proper hashing)
-    if user["password"] != password:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    
     if not user["is_active"]:
         raise HTTPException(status_code=401, detail="Account disabled")
     
@@ -1,17 +1,32 @@
 """
 Tenant management API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import get_db, SessionLocal
 from app.api.endpoints.auth import get_current_user
 from app.db import models
 from app.services.tenant_isolation import TenantIsolationService
-from app.security.audit import AuditManager, AuditAction, AuditSeverity
+from app.audit.logger import HIPAAAuditLogger
 from typing import Optional, List, Dict, Any
 
 router = APIRouter(prefix="/tenant", tags=["tenant"])
 
+def _log_tenant_admin_access(user_id: int, username: str, tenant_id: Optional[str], access_type: str):
+    """Write a tenant admin-access audit entry; runs as a background task with its own session"""
+    db = SessionLocal()
+    try:
+        HIPAAAuditLogger.log_action(
+            db=db,
+            user_id=user_id,
+            username=username,
+            action_type="TENANT_ADMIN_ACCESS",
+            resource_type="tenant",
+            description=f"Tenant admin {access_type}" + (f" for tenant {tenant_id}" if tenant_id else "")
+        )
+    finally:
+        db.close()
+
 @router.get("/info")
 async def get_tenant_info(
     db: Session = Depends(get_db),
@@ -45,21 +60,8 @@ async def get_tenant_users(
     """
     try:
         tenant_id = TenantIsolationService.get_user_tenant_id(current_user)
-        users = TenantIsolationService.get_tenant_users(db, tenant_id, skip, limit)
-        
-        # Return safe user data (no passwords)
-        user_data = []
-        for user in users:
-            user_data.append({
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "is_active": user.is_active,
-                "is_admin": user.is_admin,
-                "role": user.role,
-                "last_login": user.last_login,
-                "created_at": user.created_at
-            })
+        # Column projection of safe user data (no passwords), already as dicts
+        user_data = TenantIsolationService.get_tenant_users(db, tenant_id, skip, limit)
         
         return {
             "tenant_id": tenant_id,
@@ -134,15 +136,16 @@ async def verify_tenant_access(
         if resource_type not in ["note", "patient", "user"]:
             raise HTTPException(status_code=400, detail="Invalid resource type")
         
+        tenant_id = TenantIsolationService.get_user_tenant_id(current_user)
         has_access = TenantIsolationService.verify_tenant_access(
-            db, current_user, resource_type, resource_id
+            db, current_user, resource_type, resource_id, tenant_id=tenant_id
         )
         
         return {
             "has_access": has_access,
             "resource_type": resource_type,
             "resource_id": resource_id,
-            "tenant_id": TenantIsolationService.get_user_tenant_id(current_user)
+            "tenant_id": tenant_id
         }
         
     except HTTPException:
@@ -195,6 +198,7 @@ async def migrate_user_to_tenant(
 
 @router.get("/admin/list")
 async def list_all_tenants(
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -214,6 +218,11 @@ async def list_all_tenants(
             stats = TenantIsolationService.get_tenant_statistics(db, tenant_id)
             tenant_stats.append(stats)
         
+        # Log the admin access after the response is sent
+        background_tasks.add_task(
+            _log_tenant_admin_access, current_user.id, current_user.username, None, "list_view"
+        )
+        
         return {
             "tenants": tenant_stats,
             "total_tenants": len(tenants)
@@ -227,6 +236,7 @@ async def list_all_tenants(
 @router.get("/admin/statistics/{tenant_id}")
 async def get_admin_tenant_statistics(
     tenant_id: str,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -240,18 +250,9 @@ async def get_admin_tenant_statistics(
         
         stats = TenantIsolationService.get_tenant_statistics(db, tenant_id)
         
-        # Log the admin access
-        AuditManager.log_action(
-            db=db,
-            user_id=current_user.id,
-            action="tenant_admin_access",
-            resource_type="tenant",
-            resource_id=tenant_id,
-            severity=AuditSeverity.HIGH.value,
-            details={
-                "tenant_id": tenant_id,
-                "access_type": "statistics_view"
-            }
+        # Log the admin access after the response is sent
+        background_tasks.add_task(
+            _log_tenant_admin_access, current_user.id, current_user.username, tenant_id, "statistics_view"
         )
         
         return {
@@ -2,22 +2,56 @@
 transcribe.py: Defines the /transcribe endpoint for audio transcription.
 """
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query, WebSocket, WebSocketDisconnect, Depends
-from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 import tempfile
-from app.services.transcription import transcription_service
+import io
+import json
+from app.services.transcription import transcription_service, StreamingTranscriber
 from app.services.s3_service import s3_service
 from pathlib import Path
-from app.services.ai_summary import summarize_note, NoteSummary
+from app.services.ai_summary import summarize_note_cached, NoteSummary
 from app.services.preferences import load_user_preferences
 from app.api.endpoints.auth import get_current_user
 from app.db.database import get_db
+import asyncio
+import logging
 import os
 import uuid
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# Uploads below this size are transcribed from memory instead of a temp file
+SMALL_UPLOAD_BYTES = 10 * 1024 * 1024
+# Larger uploads are streamed to the temp file in chunks of this size
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Leading 4-byte magic numbers of accepted audio containers, packed as big-endian ints
+_AUDIO_MAGIC = frozenset(
+    int.from_bytes(magic, "big")
+    for magic in (
+        b"RIFF",              # WAV
+        b"OggS",              # Ogg / Opus
+        b"fLaC",              # FLAC
+        b"ID3\x02", b"ID3\x03", b"ID3\x04",  # MP3 with ID3 tag
+        b"\x1a\x45\xdf\xa3",  # WebM / Matroska (browser MediaRecorder)
+    )
+)
+_FTYP = int.from_bytes(b"ftyp", "big")  # ISO BMFF (m4a/mp4) has "ftyp" at offset 4
+
+def is_audio_header(header: bytes) -> bool:
+    """Sniff the first 12 bytes of an upload for a known audio container signature."""
+    if len(header) < 4:
+        return False
+    if int.from_bytes(header[:4], "big") in _AUDIO_MAGIC:
+        return True
+    if len(header) >= 8 and int.from_bytes(header[4:8], "big") == _FTYP:
+        return True
+    # Raw MPEG audio / ADTS AAC frame: 11-bit frame sync
+    return header[0] == 0xFF and (header[1] & 0xE0) == 0xE0
+
 # POST /transcribe - Upload an audio file and receive a transcript.
 # Optionally, get a structured SOAP note summary if summarize=true.
 # Requires authentication.
@@ -33,36 +67,81 @@ async def transcribe(
     db: Session = Depends(get_db)
 ):
     """
-    Accepts an audio file, saves it to a temp file, calls the transcription service, and returns the transcript.
+    Accepts an audio file, buffers it in memory (small uploads) or a temp file, calls the transcription service, and returns the transcript.
     If summarize=true, also returns a structured SOAP note summary.
     """
     # Validate file type
     if not file.content_type.startswith("audio/"):
         raise HTTPException(status_code=400, detail="Only audio files are accepted.")
     
+    # Reject non-audio payloads by their magic bytes before buffering or writing anything
+    header = await file.read(12)
+    await file.seek(0)
+    if header and not is_audio_header(header):
+        raise HTTPException(status_code=415, detail="Unsupported or invalid audio file.")
+    
     temp_path = None
+    audio_buffer = None
+    summary_task = None
     try:
-        # Preserve the extension of the uploaded file
-        suffix = Path(file.filename).suffix or ".wav"
-        fd, temp_path = tempfile.mkstemp(suffix=suffix)
-        with os.fdopen(fd, "wb") as tmp:
+        if file.size is not None and file.size < SMALL_UPLOAD_BYTES:
+            # Small upload: keep the bytes in memory and skip the temp file entirely
             contents = await file.read()
             if not contents:
                 raise HTTPException(status_code=400, detail="Empty file uploaded.")
-            tmp.write(contents)
-            tmp.flush()
+            audio_buffer = io.BytesIO(contents)
+            file_size = len(contents)
+        else:
+            # Preserve the extension of the uploaded file
+            suffix = Path(file.filename).suffix or ".wav"
+            fd, temp_path = tempfile.mkstemp(suffix=suffix)
+            # Stream to disk in fixed-size chunks so memory stays O(chunk), counting bytes as we go
+            file_size = 0
+            with os.fdopen(fd, "wb") as tmp:
+                while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                    tmp.write(chunk)
+                    file_size += len(chunk)
 
-        # Confirm temp file really exists
-        if not os.path.exists(temp_path):
-            raise HTTPException(status_code=500, detail=f"Temp file {temp_path} not found before transcription.")
+            if file_size == 0:
+                raise HTTPException(status_code=400, detail="Empty file uploaded.")
 
-        # Check file size
-        file_size = os.path.getsize(temp_path)
-        if file_size == 0:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+        async def upload_to_s3():
+            """Upload the audio to S3, returning the key on success or None to keep it local."""
+            if not s3_service.is_available():
+                return None
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            unique_id = str(uuid.uuid4())[:8]
+            s3_key = f"audio/{current_user.id}/{timestamp}_{unique_id}_{Path(file.filename).name}"
+            if audio_buffer is not None:
+                # Separate stream over the same bytes so the transcription read position is untouched
+                uploaded = await s3_service.upload_fileobj(io.BytesIO(audio_buffer.getvalue()), s3_key, file.content_type)
+            else:
+                uploaded = await s3_service.upload_file(Path(temp_path), s3_key, file.content_type)
+            return s3_key if uploaded else None
 
-        # Transcribe
-        transcript = await transcription_service.transcribe(Path(temp_path))
+        # Transcribe and upload to S3 concurrently; both run off the event loop
+        s3_task = asyncio.create_task(upload_to_s3())
+        try:
+            transcript = await transcription_service.transcribe(
+                audio_buffer if audio_buffer is not None else Path(temp_path)
+            )
+        except Exception:
+            # Keep the temp file in place until the upload has finished with it
+            await asyncio.gather(s3_task, return_exceptions=True)
+            raise
+        
+        # Start the summary as soon as the transcript exists so it overlaps the rest of the S3 upload
+        async def summarize_transcript():
+            prefs = load_user_preferences(current_user.id)
+            return await summarize_note_cached(transcript, preferences=prefs)
+        
+        if summarize:
+            summary_task = asyncio.create_task(summarize_transcript())
+        
+        (s3_key,) = await asyncio.gather(s3_task, return_exceptions=True)
+        if isinstance(s3_key, BaseException):
+            print(f"S3 upload failed, keeping file local: {s3_key}")
+            s3_key = None
         
         # Store file in S3 if available, otherwise keep local
         file_metadata = {
@@ -72,25 +151,18 @@ async def transcribe(
             "file_size": file_size
         }
         
-        # Generate S3 key if using S3
-        if s3_service.is_available():
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            unique_id = str(uuid.uuid4())[:8]
-            s3_key = f"audio/{current_user.id}/{timestamp}_{unique_id}_{Path(file.filename).name}"
-            
-            # Upload to S3
-            if await s3_service.upload_file(Path(temp_path), s3_key, file.content_type):
-                file_metadata["s3_key"] = s3_key
-                file_metadata["storage_provider"] = "s3"
-                # Clean up local temp file after successful S3 upload
-                if os.path.exists(temp_path):
+        if s3_key:
+            file_metadata["s3_key"] = s3_key
+            file_metadata["storage_provider"] = "s3"
+            # Clean up local temp file after successful S3 upload
+            if temp_path:
+                try:
                     os.remove(temp_path)
-                    temp_path = None
-            else:
-                # Fallback to local storage if S3 upload fails
-                file_metadata["storage_provider"] = "local"
-                file_metadata["local_path"] = temp_path
+                except FileNotFoundError:
+                    pass
+                temp_path = None
         else:
+            # Local storage when S3 is unavailable or the upload failed
             file_metadata["storage_provider"] = "local"
             file_metadata["local_path"] = temp_path
 
@@ -114,10 +186,9 @@ async def transcribe(
             response["file_metadata"]["s3_key"] = file_metadata["s3_key"]
             response["file_metadata"]["download_url"] = s3_service.get_file_url(file_metadata["s3_key"])
 
-        if summarize:
+        if summary_task is not None:
             try:
-                prefs = load_user_preferences(current_user.id)
-                summary: NoteSummary = await summarize_note(transcript, preferences=prefs)
+                summary: NoteSummary = await summary_task
                 response["summary"] = summary.model_dump()
             except Exception as e:
                 print(f"Failed to generate SOAP summary: {e}")
@@ -125,7 +196,7 @@ async def transcribe(
                 response["summary_error"] = f"Failed to generate SOAP summary: {str(e)}"
                 response["summary"] = None
 
-        return JSONResponse(status_code=200, content=response)
+        return response
 
     except HTTPException:
         raise
@@ -134,31 +205,127 @@ async def transcribe(
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
 
     finally:
-        if temp_path and os.path.exists(temp_path):
+        if summary_task is not None and not summary_task.done():
+            summary_task.cancel()
+        if temp_path:
             try:
                 os.remove(temp_path)
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 print(f"Failed to remove temp file {temp_path}: {e}")
 
-# WebSocket endpoint for live, chunked transcription using Whisper
-# Usage: Client streams audio chunks (e.g., PCM or WAV bytes) to this endpoint
-# The server transcribes each chunk and sends back the partial transcript
+# Live transcription consumes 16 kHz, 16-bit mono PCM through a rolling Whisper buffer
+LIVE_SAMPLE_RATE = 16000
+LIVE_MIN_CHUNK_SECONDS = 1.0  # new audio required before another Whisper pass
+LIVE_BUFFER_TRIM_SECONDS = 15.0  # committed audio beyond this is trimmed from the buffer
+LIVE_MAX_BUFFER_SECONDS = 30.0  # hard cap when nothing has been committed
+LIVE_MAX_QUEUED_CHUNKS = 256  # frames waiting for the worker before receive stops reading
+
+# Audio format accepted on /ws/live-transcribe (binary frames only, no JSON/base64 wrapping)
+LIVE_AUDIO_FORMAT = {"sample_rate": LIVE_SAMPLE_RATE, "channels": 1, "encoding": "pcm_s16le"}
+
+# WebSocket endpoint for live, streaming transcription using Whisper
+# Usage: Client may open with a JSON text frame such as
+#   {"sample_rate": 16000, "channels": 1, "encoding": "pcm_s16le"}
+# which the server echoes back as {"type": "config", ...} or rejects with close code 1003.
+# Audio is then streamed as binary frames of raw 16 kHz, 16-bit little-endian mono PCM;
+# text frames after the handshake are rejected.
+# The server re-transcribes a rolling buffer about once a second and sends back
+# only the words two consecutive passes agree on (LocalAgreement-2)
 # On disconnect, the server sends the full transcript and a SOAP summary
 @router.websocket("/ws/live-transcribe")
 async def websocket_live_transcribe(websocket: WebSocket):
     await websocket.accept()
-    transcript = ""
+
+    # Optional format handshake before the first audio frame
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        return
+    first_audio = message.get("bytes")
+    if first_audio is None:
+        try:
+            requested = json.loads(message.get("text") or "")
+        except ValueError:
+            requested = None
+        if not isinstance(requested, dict) or any(
+            requested.get(key, value) != value for key, value in LIVE_AUDIO_FORMAT.items()
+        ):
+            await websocket.send_json({"error": "Unsupported audio format", "expected": LIVE_AUDIO_FORMAT})
+            await websocket.close(code=1003)
+            return
+        await websocket.send_json({"type": "config", **LIVE_AUDIO_FORMAT})
+
+    streamer = StreamingTranscriber(
+        transcription_service,
+        sample_rate=LIVE_SAMPLE_RATE,
+        min_chunk_seconds=LIVE_MIN_CHUNK_SECONDS,
+        buffer_trim_seconds=LIVE_BUFFER_TRIM_SECONDS,
+        max_buffer_seconds=LIVE_MAX_BUFFER_SECONDS,
+    )
+    # Bounded so a stalled Whisper pass applies backpressure to the socket instead of buffering
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=LIVE_MAX_QUEUED_CHUNKS)
+
+    async def transcribe_stream():
+        # Dedicated worker so receive_bytes never waits on model inference
+        try:
+            done = False
+            while not done:
+                data = await chunks.get()
+                # Fold in everything that arrived during the previous Whisper pass
+                while True:
+                    if data is None:
+                        done = True
+                        break
+                    streamer.insert_audio(data)
+                    if chunks.empty():
+                        break
+                    data = chunks.get_nowait()
+                if done:
+                    if streamer.pending_bytes:
+                        await streamer.process()
+                    return
+                if streamer.ready():
+                    confirmed_text = await streamer.process()
+                    if not confirmed_text:
+                        continue
+                    # Send newly confirmed words back to client
+                    try:
+                        await websocket.send_text(confirmed_text)
+                    except Exception:
+                        pass  # Client already gone; keep accumulating for the final summary
+        except Exception:
+            logger.exception("Live transcription pass failed")
+            # Drop queued audio so a receive loop blocked on a full queue wakes up and sees
+            # the worker is done; words committed so far still go into the final summary
+            while not chunks.empty():
+                chunks.get_nowait()
+
+    worker = asyncio.create_task(transcribe_stream())
     try:
+        if first_audio:
+            await chunks.put(first_audio)
         while True:
             # Receive audio chunk from client
-            data = await websocket.receive_bytes()
-            # TODO: Buffer and preprocess audio chunks as needed (e.g., accumulate enough for Whisper)
-            # For demonstration, treat each chunk as a complete short audio segment
-            chunk_text = await transcription_service.transcribe_chunk(data)
-            transcript += chunk_text + " "
-            # Send partial transcript back to client
-            await websocket.send_text(chunk_text)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is None:
+                # Audio must arrive as binary PCM frames
+                await websocket.close(code=1003)
+                return
+            if worker.done():
+                # Only a failed worker finishes before the end-of-stream marker
+                await websocket.send_json({"error": "Live transcription failed", "partial_transcript": streamer.text})
+                await websocket.close(code=1011)
+                return
+            await chunks.put(message["bytes"])
     except WebSocketDisconnect:
+        await chunks.put(None)
+        await worker
+        streamer.finish()
+        transcript = streamer.text
+
         # On disconnect, generate SOAP summary
         prefs = None
         try:
@@ -166,9 +333,12 @@ async def websocket_live_transcribe(websocket: WebSocket):
             prefs = None
         except Exception:
             prefs = None
-        summary = await summarize_note(transcript, preferences=prefs)
+        summary = await summarize_note_cached(transcript, preferences=prefs)
         await websocket.send_json({
             "full_transcript": transcript.strip(),
             "soap_summary": summary.model_dump()
         })
         await websocket.close()
+    finally:
+        if not worker.done():
+            worker.cancel()
@@ -6,11 +6,18 @@ from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import JSONResponse
 from jose import jwt
-from datetime import datetime, timedelta
 from app.config import settings
+import hashlib
+import hmac
+import time
 
 router = APIRouter()
 
+# Signing parameters resolved once at import instead of on every login
+_SIGNING_KEY = settings.secret_key.encode()
+_ALG = settings.algorithm
+_TOKEN_TTL_SECONDS = settings.access_token_expire_minutes * 60
+
 # Simple in-memory user storage
 USERS = {
     "testuser": {
@@ -27,12 +34,30 @@ USERS = {
     }
 }
 
+def _hash_password(password: str) -> bytes:
+    return hashlib.sha256(password.encode()).digest()
+
+# Keep only SHA-256 digests in memory; plaintext is dropped at import
+for _user in USERS.values():
+    _user["pw_hash"] = _hash_password(_user.pop("password"))
+
+# Compared against when the username is unknown so both paths take the same time
+_DUMMY_PW_HASH = _hash_password("")
+
+def _authenticate(username: str, password: str):
+    """Return the user record if the password matches, using a constant-time compare"""
+    user = USERS.get(username)
+    expected = user["pw_hash"] if user else _DUMMY_PW_HASH
+    if not hmac.compare_digest(expected, _hash_password(password)) or user is None:
+        return None
+    return user
+
 def create_access_token(data: dict):
     """Create a JWT token"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    # "exp" is a NumericDate, so an integer timestamp skips datetime coercion in jose
+    to_encode["exp"] = int(time.time()) + _TOKEN_TTL_SECONDS
+    encoded_jwt = jwt.encode(to_encode, _SIGNING_KEY, algorithm=_ALG)
     return encoded_jwt
 
 @router.post("/working-login")
@@ -44,14 +69,9 @@ async def working_login(form_data: OAuth2PasswordRequestForm = Depends()):
     username = form_data.username
     password = form_data.password
     
-    # Check if user exists
-    if username not in USERS:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    user = USERS[username]
-    
-    # Check password
-    if user["password"] != password:
+    # Check user and password
+    user = _authenticate(username, password)
+    if user is None:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     if not user["is_active"]:
@@ -78,14 +98,9 @@ async def working_login_cookie(request: Request, response: Response, form_data:
     username = form_data.username
     password = form_data.password
     
-    # Check if user exists
-    if username not in USERS:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    user = USERS[username]
-    
-    # Check password
-    if user["password"] != password:
+    # Check user and password
+    user = _authenticate(username, password)
+    if user is None:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     if not user["is_active"]:
@@ -124,8 +139,7 @@ async def get_working_users():
             {
                 "username": username,
                 "email": user["email"],
-                "is_admin": user["is_admin"],
-                "password": user["password"]  # Only for testing
+                "is_admin": user["is_admin"]
             }
             for username, user in USERS.items()
         ]
@@ -148,7 +162,7 @@ async def working_register(user_data: dict):
     
     # Add new user
     USERS[username] = {
-        "password": password,
+        "pw_hash": _hash_password(password),
         "email": email,
         "is_active": True,
         "is_admin": False
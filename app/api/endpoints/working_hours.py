@@ -2,19 +2,32 @@
 Working hours management endpoints for tracking user work schedules
 and providing note finalization reminders.
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import func, literal
+from sqlalchemy.orm import Session, load_only
 from app.db.database import get_db
 from app.db import models, schemas
 from app.api.endpoints.auth import get_current_user
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, time, timezone, timedelta
+from functools import lru_cache
 from typing import List, Optional
 from pydantic import BaseModel
 import pytz
+import hashlib
 import json
+import re
+import time as time_module
 
 router = APIRouter(prefix="/working-hours", tags=["working-hours"])
 
+# 24-hour "HH:MM"
+_HHMM = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+
+@lru_cache(maxsize=512)
+def _tz(name: str):
+    """Memoized pytz.timezone lookup; unknown names raise and are not cached"""
+    return pytz.timezone(name)
+
 class WorkingHoursUpdate(BaseModel):
     work_start_time: str
     work_end_time: str
@@ -30,6 +43,66 @@ class WorkingHoursResponse(BaseModel):
     time_until_end: Optional[int] = None  # Minutes until work ends
     pending_notes_count: int = 0
 
+def _pending_today_criteria(current_user: models.User, now: datetime) -> list:
+    """
+    Filter for the user's pending notes created today, as a half-open
+    [midnight, next midnight) range so (provider_id, status, created_at) can serve it.
+    """
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        models.Note.provider_id == current_user.id,
+        models.Note.status.in_(['pending_review', 'draft']),
+        models.Note.created_at >= today_start,
+        models.Note.created_at < today_start + timedelta(days=1),
+    ]
+
+def _compute_working_hours(
+    current_user: models.User, db: Session, count_pending: bool = True, now: Optional[datetime] = None
+) -> WorkingHoursResponse:
+    """Build the user's working hours status (one COUNT query); shared by the routes below"""
+    # Parsed once per user instance
+    working_days = current_user.working_days_list
+    
+    # Get current time in user's timezone (callers that also need it pass their own)
+    user_tz = _tz(current_user.timezone)
+    if now is None:
+        now = datetime.now(user_tz)
+    current_day = now.isoweekday()  # 1=Monday, 7=Sunday
+    
+    # Check if today is a working day
+    is_workday = current_day in working_days
+    
+    # Calculate time until work ends (if it's a workday)
+    time_until_end = None
+    if is_workday:
+        try:
+            hours, minutes = map(int, current_user.work_end_time.split(":"))
+            work_end = time(hours, minutes)
+            work_end_today = datetime.combine(now.date(), work_end)
+            work_end_today = user_tz.localize(work_end_today)
+            
+            if now < work_end_today:
+                time_until_end = int((work_end_today - now).total_seconds() / 60)
+        except ValueError:
+            pass  # Invalid time format
+    
+    # Count pending notes for today (skipped when the caller only needs the schedule)
+    pending_notes_count = 0
+    if count_pending:
+        pending_notes_count = db.query(models.Note).filter(
+            *_pending_today_criteria(current_user, now)
+        ).count()
+    
+    return WorkingHoursResponse(
+        work_start_time=current_user.work_start_time,
+        work_end_time=current_user.work_end_time,
+        timezone=current_user.timezone,
+        working_days=working_days,
+        is_workday=is_workday,
+        time_until_end=time_until_end,
+        pending_notes_count=pending_notes_count
+    )
+
 @router.get("/", response_model=WorkingHoursResponse)
 def get_working_hours(
     current_user: models.User = Depends(get_current_user),
@@ -37,51 +110,7 @@ def get_working_hours(
 ):
     """Get user's working hours and current status"""
     try:
-        # Parse working days
-        working_days = [int(day) for day in current_user.working_days.split(',')]
-        
-        # Get current time in user's timezone
-        user_tz = pytz.timezone(current_user.timezone)
-        now = datetime.now(user_tz)
-        current_day = now.isoweekday()  # 1=Monday, 7=Sunday
-        
-        # Check if today is a working day
-        is_workday = current_day in working_days
-        
-        # Calculate time until work ends (if it's a workday)
-        time_until_end = None
-        if is_workday:
-            try:
-                work_end = datetime.strptime(current_user.work_end_time, "%H:%M").time()
-                work_end_today = datetime.combine(now.date(), work_end)
-                work_end_today = user_tz.localize(work_end_today)
-                
-                if now < work_end_today:
-                    time_until_end = int((work_end_today - now).total_seconds() / 60)
-            except ValueError:
-                pass  # Invalid time format
-        
-        # Count pending notes for today
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        pending_notes_count = db.query(models.Note).filter(
-            models.Note.provider_id == current_user.id,
-            models.Note.created_at >= today_start,
-            models.Note.created_at <= today_end,
-            models.Note.status.in_(['pending_review', 'draft'])
-        ).count()
-        
-        return WorkingHoursResponse(
-            work_start_time=current_user.work_start_time,
-            work_end_time=current_user.work_end_time,
-            timezone=current_user.timezone,
-            working_days=working_days,
-            is_workday=is_workday,
-            time_until_end=time_until_end,
-            pending_notes_count=pending_notes_count
-        )
-        
+        return _compute_working_hours(current_user, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get working hours: {str(e)}")
 
@@ -94,15 +123,12 @@ def update_working_hours(
     """Update user's working hours"""
     try:
         # Validate time format
-        try:
-            datetime.strptime(working_hours.work_start_time, "%H:%M")
-            datetime.strptime(working_hours.work_end_time, "%H:%M")
-        except ValueError:
+        if not (_HHMM.match(working_hours.work_start_time) and _HHMM.match(working_hours.work_end_time)):
             raise HTTPException(status_code=400, detail="Invalid time format. Use HH:MM")
         
         # Validate timezone
         try:
-            pytz.timezone(working_hours.timezone)
+            _tz(working_hours.timezone)
         except pytz.exceptions.UnknownTimeZoneError:
             raise HTTPException(status_code=400, detail="Invalid timezone")
         
@@ -114,13 +140,13 @@ def update_working_hours(
         current_user.work_start_time = working_hours.work_start_time
         current_user.work_end_time = working_hours.work_end_time
         current_user.timezone = working_hours.timezone
-        current_user.working_days = ','.join(map(str, working_hours.working_days))
+        current_user.working_days_list = working_hours.working_days
         
         db.commit()
         db.refresh(current_user)
         
         # Return updated working hours with current status
-        return get_working_hours(current_user, db)
+        return _compute_working_hours(current_user, db)
         
     except HTTPException:
         raise
@@ -129,29 +155,56 @@ def update_working_hours(
 
 @router.get("/finalization-warning")
 def get_finalization_warning(
+    request: Request,
+    response: Response,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Check if user should be warned about pending notes before workday ends"""
     try:
-        # Get working hours
-        working_hours = get_working_hours(current_user, db)
+        # Pollers revalidate with If-None-Match; the answer can only change when one of the
+        # user's notes changes, their schedule changes, or the minute rolls over
+        last_note_change = db.query(func.max(models.Note.updated_at)).filter(
+            models.Note.provider_id == current_user.id
+        ).scalar()
+        etag_source = (
+            f"{current_user.id}:{last_note_change}:{current_user.working_days}:"
+            f"{current_user.work_end_time}:{current_user.timezone}:{int(time_module.time()) // 60}"
+        )
+        etag = f'"{hashlib.blake2s(etag_source.encode()).hexdigest()}"'
+        cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=30"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=cache_headers)
+        response.headers.update(cache_headers)
+        
+        # Get working hours; pending notes are checked below only if it matters
+        now = datetime.now(_tz(current_user.timezone))
+        working_hours = _compute_working_hours(current_user, db, count_pending=False, now=now)
         
         # If not a workday, no warning needed
         if not working_hours.is_workday:
             return {"should_warn": False, "reason": "Not a workday"}
         
+        # One pending-notes query either way: the COUNT only when a warning would carry it,
+        # otherwise an EXISTS-style probe that stops at the first row
+        criteria = _pending_today_criteria(current_user, now)
+        ending_soon = working_hours.time_until_end is not None and working_hours.time_until_end <= 30
+        if ending_soon:
+            pending_notes_count = db.query(models.Note).filter(*criteria).count()
+        else:
+            pending_notes_count = 1 if db.query(literal(True)).filter(*criteria).limit(1).scalar() else 0
+        
         # If no pending notes, no warning needed
-        if working_hours.pending_notes_count == 0:
+        if not pending_notes_count:
             return {"should_warn": False, "reason": "No pending notes"}
         
         # If less than 30 minutes until work ends, show warning
-        if working_hours.time_until_end is not None and working_hours.time_until_end <= 30:
+        if ending_soon:
             return {
                 "should_warn": True,
                 "reason": "Workday ending soon",
                 "minutes_remaining": working_hours.time_until_end,
-                "pending_notes_count": working_hours.pending_notes_count
+                "pending_notes_count": pending_notes_count
             }
         
         return {"should_warn": False, "reason": "Workday not ending soon"}
@@ -167,17 +220,15 @@ def get_pending_notes_today(
     """Get all pending notes created today"""
     try:
         # Get current time in user's timezone
-        user_tz = pytz.timezone(current_user.timezone)
+        user_tz = _tz(current_user.timezone)
         now = datetime.now(user_tz)
         
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        pending_notes = db.query(models.Note).filter(
-            models.Note.provider_id == current_user.id,
-            models.Note.created_at >= today_start,
-            models.Note.created_at <= today_end,
-            models.Note.status.in_(['pending_review', 'draft'])
+        # Only the summary columns; the note bodies are not part of this response
+        pending_notes = db.query(models.Note).options(load_only(
+            models.Note.id, models.Note.note_type, models.Note.status,
+            models.Note.created_at, models.Note.patient_id
+        )).filter(
+            *_pending_today_criteria(current_user, now)
         ).all()
         
         return [
@@ -185,7 +236,7 @@ def get_pending_notes_today(
                 "id": note.id,
                 "title": note.note_type or f"Note #{note.id}",
                 "status": note.status,
-                "created_at": note.created_at.isoformat(),
+                "created_at": note.created_at,  # FastAPI serializes datetimes as ISO 8601
                 "patient_id": note.patient_id
             }
             for note in pending_notes
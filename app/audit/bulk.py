@@ -0,0 +1,95 @@
+"""
+Batched persistence for append-only audit tables (AuditLog, LoginAttempt)
+"""
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from app.db.database import SessionLocal
+
+audit_logger = logging.getLogger("hipaa_audit")
+
+_STOP = object()
+
+class AuditWriter:
+    """
+    Batches audit rows and writes them from a background thread,
+    one transaction per batch instead of one commit per event.
+    Until start() is called, callers keep writing synchronously.
+    """
+    
+    def __init__(self, batch_size: int = 500, flush_interval: float = 0.25):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Start the writer thread (called on application startup)"""
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 10.0):
+        """Flush everything still queued and stop the writer thread (called on shutdown)"""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+    
+    def submit(self, model, row: Dict[str, Any]) -> bool:
+        """Queue a row for model's table in the next batch; False if the writer isn't running"""
+        if not self.running:
+            return False
+        self._queue.put((model, row))
+        return True
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+    
+    def _write(self, batch: List[Tuple[Any, Dict[str, Any]]]):
+        rows_by_model = defaultdict(list)
+        for model, row in batch:
+            rows_by_model[model].append(row)
+        db = SessionLocal()
+        try:
+            # Core executemany per table: multi-row INSERTs, no ORM unit of work for append-only rows
+            for model, rows in rows_by_model.items():
+                db.execute(insert(model), rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            audit_logger.critical(f"AUDIT_LOG_FAILURE: Failed to write {len(batch)} audit events: {str(e)}")
+        finally:
+            db.close()
+
+# Shared writer; started/stopped by the application lifecycle hooks in main.py
+audit_writer = AuditWriter()
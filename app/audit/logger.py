@@ -4,8 +4,10 @@ Provides centralized audit logging for all PHI access and modifications
 """
 import json
 from typing import Optional, List, Dict, Any
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from app.audit.models import AuditLog, LoginAttempt
+from app.audit.models import AuditLog, LoginAttempt, get_utc_now
+from app.audit.bulk import audit_writer
 from app.db.database import get_db
 from fastapi import Request
 import logging
@@ -17,6 +19,15 @@ logging.basicConfig(
 )
 audit_logger = logging.getLogger("hipaa_audit")
 
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:  # orjson is optional, as in main.py
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj)
+
 class HIPAAAuditLogger:
     """
     HIPAA-compliant audit logger for tracking all PHI access
@@ -35,7 +46,8 @@ class HIPAAAuditLogger:
         phi_fields_accessed: Optional[List[str]] = None,
         request: Optional[Request] = None,
         success: bool = True,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        durable: bool = False
     ):
         """
         Log an audit event
@@ -53,6 +65,7 @@ class HIPAAAuditLogger:
             request: FastAPI request object for IP and user agent
             success: Whether the action succeeded
             error_message: Error message if action failed
+            durable: Commit in the caller's session before returning instead of batching
         """
         try:
             # Extract request details
@@ -70,28 +83,31 @@ class HIPAAAuditLogger:
             # Convert PHI fields to JSON
             phi_fields_json = None
             if phi_fields_accessed:
-                phi_fields_json = json.dumps(phi_fields_accessed)
+                phi_fields_json = _dumps(phi_fields_accessed)
             
-            # Create audit log entry
-            audit_entry = AuditLog(
-                user_id=user_id,
-                username=username,
-                user_ip=user_ip,
-                user_agent=user_agent,
-                action_type=action_type.upper(),
-                resource_type=resource_type.lower(),
-                resource_id=resource_id,
-                patient_id=patient_id,
-                phi_fields_accessed=phi_fields_json,
-                description=description,
-                success=success,
-                error_message=error_message,
-                endpoint=endpoint,
-                method=method
-            )
+            # Audit log row as plain column values for a Core INSERT
+            audit_entry = {
+                "user_id": user_id,
+                "username": username,
+                "user_ip": user_ip,
+                "user_agent": user_agent,
+                "action_type": action_type.upper(),
+                "resource_type": resource_type.lower(),
+                "resource_id": resource_id,
+                "patient_id": patient_id,
+                "phi_fields_accessed": phi_fields_json,
+                "description": description,
+                "success": success,
+                "error_message": error_message,
+                "endpoint": endpoint,
+                "method": method,
+                "created_at": get_utc_now()  # Event time, not batch flush time
+            }
             
-            db.add(audit_entry)
-            db.commit()
+            # Batched by the background writer when running; otherwise written right away
+            if durable or not audit_writer.submit(AuditLog, audit_entry):
+                db.execute(insert(AuditLog), [audit_entry])
+                db.commit()
             
             # Also log to structured file logs
             log_data = {
@@ -109,10 +125,11 @@ class HIPAAAuditLogger:
                 "method": method
             }
             
+            payload = _dumps(log_data)
             if success:
-                audit_logger.info(f"AUDIT: {json.dumps(log_data)}")
+                audit_logger.info(f"AUDIT: {payload}")
             else:
-                audit_logger.error(f"AUDIT_FAILURE: {json.dumps(log_data)}")
+                audit_logger.error(f"AUDIT_FAILURE: {payload}")
                 
         except Exception as e:
             # Critical: Audit logging failure must be logged
@@ -157,16 +174,19 @@ class HIPAAAuditLogger:
         Log login attempts for security monitoring
         """
         try:
-            login_attempt = LoginAttempt(
-                username=username,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                success=success,
-                failure_reason=failure_reason
-            )
+            login_attempt = {
+                "username": username,
+                "ip_address": ip_address,
+                "user_agent": user_agent,
+                "success": success,
+                "failure_reason": failure_reason,
+                "created_at": get_utc_now()
+            }
             
-            db.add(login_attempt)
-            db.commit()
+            # Failed attempts are security-critical and committed before returning
+            if not success or not audit_writer.submit(LoginAttempt, login_attempt):
+                db.execute(insert(LoginAttempt), [login_attempt])
+                db.commit()
             
             # Also log to audit system
             HIPAAAuditLogger.log_action(
@@ -177,7 +197,8 @@ class HIPAAAuditLogger:
                 resource_type="auth",
                 description=f"Login attempt from {ip_address}",
                 success=success,
-                error_message=failure_reason
+                error_message=failure_reason,
+                durable=not success  # Failed logins are security-critical; don't leave them in memory
             )
             
         except Exception as e:
@@ -210,19 +231,19 @@ class HIPAAAuditLogger:
         except Exception as e:
             audit_logger.critical(f"PASSWORD_CHANGE_AUDIT_FAILURE: {str(e)}")
 
+# PHI columns on the patient record
+_PHI_FIELDS = frozenset({
+    'first_name', 'last_name', 'date_of_birth', 'phone_number',
+    'email', 'address', 'city', 'state', 'zip_code'
+})
+
 # Helper function to get PHI field names from patient data
 def get_phi_fields(patient_data: Dict[str, Any]) -> List[str]:
     """
     Identify PHI fields in patient data for audit logging
     """
-    phi_fields = []
-    phi_field_names = [
-        'first_name', 'last_name', 'date_of_birth', 'phone_number', 
-        'email', 'address', 'city', 'state', 'zip_code'
-    ]
-    
-    for field in phi_field_names:
-        if field in patient_data and patient_data[field] is not None:
-            phi_fields.append(field)
-    
-    return phi_fields
\ No newline at end of file
+    # Set intersection runs in C; sorting keeps the audit trail order stable across processes
+    return sorted(
+        field for field in _PHI_FIELDS & patient_data.keys()
+        if patient_data[field] is not None
+    )
@@ -2,15 +2,15 @@
 HIPAA Audit Logging Models
 Tracks all access and modifications to Protected Health Information (PHI)
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index, event, func, insert, inspect, text
+from sqlalchemy.orm import Session, relationship
 from app.db.database import Base
-from datetime import datetime
-import pytz
+from datetime import datetime, timezone
 
 def get_utc_now():
     """Get current UTC time with timezone info"""
-    return datetime.now(pytz.UTC)
+    # stdlib fixed-offset tzinfo; cheaper than pytz on this per-audit-row path
+    return datetime.now(timezone.utc)
 
 class AuditLog(Base):
     """
@@ -44,18 +44,29 @@ class AuditLog(Base):
     endpoint = Column(String, nullable=True)  # API endpoint accessed
     method = Column(String, nullable=True)  # HTTP method (GET, POST, etc.)
     
-    # Timestamps
-    created_at = Column(DateTime(timezone=True), default=get_utc_now, nullable=False)
+    # Timestamps: assigned by the database; batched writers pass the event time explicitly
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
-    # Relationships
-    user = relationship("User", back_populates="audit_logs")
-    patient = relationship("Patient")
+    # Relationships: listings read the username snapshot above; anything that really needs
+    # the related rows must eager-load them (selectinload) instead of one SELECT per log
+    user = relationship("User", back_populates="audit_logs", lazy="raise")
+    patient = relationship("Patient", lazy="raise")
 
 class LoginAttempt(Base):
     """
     Track all login attempts for security monitoring
     """
     __tablename__ = "login_attempts"
+    __table_args__ = (
+        # Per-IP time-window lookups for brute-force / rate-limit checks
+        Index("ix_login_attempts_ip_created", "ip_address", "created_at"),
+        # Failed attempts only; a much smaller index for failed-login detection
+        Index(
+            "ix_login_attempts_failed_ip_created", "ip_address", "created_at",
+            postgresql_where=text("success = false"),
+            sqlite_where=text("success = 0"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, nullable=False)
@@ -63,7 +74,7 @@ class LoginAttempt(Base):
     user_agent = Column(String, nullable=True)
     success = Column(Boolean, nullable=False)
     failure_reason = Column(String, nullable=True)  # Invalid password, user not found, etc.
-    created_at = Column(DateTime(timezone=True), default=get_utc_now, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 class DataRetentionPolicy(Base):
     """
@@ -78,4 +89,83 @@ class DataRetentionPolicy(Base):
     deletion_scheduled_at = Column(DateTime(timezone=True), nullable=True)
     deletion_completed_at = Column(DateTime(timezone=True), nullable=True)
     deletion_reason = Column(String, nullable=True)
-    created_at = Column(DateTime(timezone=True), default=get_utc_now, nullable=False)
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+# Flush-time auditing: models opt in with __auditable__ = "<resource_type>" and may list
+# bookkeeping columns in __audit_ignore__ whose changes alone are not worth an audit row.
+# The acting user is read from session.info["audit_user"] (set by get_current_user).
+_AUDIT_ACTIONS = (("CREATE", "new"), ("UPDATE", "dirty"), ("DELETE", "deleted"))
+
+def _changed_columns(obj) -> list:
+    """Names of mapped columns with pending changes (history only, never triggers a load)"""
+    state = inspect(obj)
+    ignored = getattr(obj, "__audit_ignore__", ())
+    return sorted(
+        attr.key for attr in state.mapper.column_attrs
+        if attr.key not in ignored and state.attrs[attr.key].history.has_changes()
+    )
+
+@event.listens_for(Session, "before_flush")
+def _collect_audits(session, flush_context, instances):
+    """Record which auditable objects this flush creates, changes or deletes"""
+    pending = session.info.setdefault("pending_audits", [])
+    for action, collection in _AUDIT_ACTIONS:
+        for obj in getattr(session, collection):
+            resource_type = getattr(obj, "__auditable__", None)
+            if not resource_type:
+                continue
+            fields = None
+            if action == "UPDATE":
+                fields = _changed_columns(obj)
+                if not fields:
+                    continue
+            pending.append((action, resource_type, obj, fields))
+
+@event.listens_for(Session, "after_flush_postexec")
+def _write_audits(session, flush_context):
+    """Insert the collected audit rows in one statement, inside the flushing transaction"""
+    pending = session.info.pop("pending_audits", None)
+    if pending:
+        _insert_audit_rows(session, pending)
+
+def audit_changes(session, action: str, objects, fields=None):
+    """
+    Audit auditable objects written by an ORM-enabled INSERT/UPDATE ... RETURNING, which
+    bypasses the unit of work and therefore the flush listeners above.
+    """
+    pending = [
+        (action, obj.__auditable__, obj, fields)
+        for obj in objects
+        if getattr(obj, "__auditable__", None)
+    ]
+    if pending:
+        _insert_audit_rows(session, pending)
+
+def _insert_audit_rows(session, pending):
+    user_id, username = session.info.get("audit_user", (None, "system"))
+    now = get_utc_now()
+    rows = []
+    for action, resource_type, obj, fields in pending:
+        # Primary keys of new rows are populated by now
+        resource_id = inspect(obj).identity[0] if inspect(obj).identity else None
+        description = f"{action.title()}d {resource_type} {resource_id}"
+        if fields:
+            description += f" (fields: {', '.join(fields)})"
+        rows.append({
+            "user_id": user_id,
+            "username": username,
+            "action_type": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "patient_id": getattr(obj, "patient_id", None),
+            "description": description,
+            "success": True,
+            "created_at": now,
+        })
+    # Core INSERT on the session's connection: no ORM objects, so no recursive flush
+    session.connection().execute(insert(AuditLog), rows)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_audits(session):
+    """A failed flush never reached after_flush_postexec; drop what it collected"""
+    session.info.pop("pending_audits", None)
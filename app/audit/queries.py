@@ -0,0 +1,43 @@
+"""
+Read helpers for the audit trail
+"""
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+from app.audit.models import AuditLog
+
+def get_audit_logs(
+    db: Session,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    username: Optional[str] = None,
+    action_type: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    patient_id: Optional[int] = None,
+    success_only: Optional[bool] = None,
+    with_user: bool = False,
+    with_patient: bool = False,
+) -> List[AuditLog]:
+    """
+    Most recent audit logs first.
+    AuditLog.user/.patient raise on lazy load; ask for them here and they are fetched
+    with one extra SELECT ... IN per relationship for the whole page.
+    """
+    stmt = select(AuditLog)
+    if username:
+        stmt = stmt.where(AuditLog.username.ilike(f"%{username}%"))
+    if action_type:
+        stmt = stmt.where(AuditLog.action_type == action_type.upper())
+    if resource_type:
+        stmt = stmt.where(AuditLog.resource_type == resource_type.lower())
+    if patient_id:
+        stmt = stmt.where(AuditLog.patient_id == patient_id)
+    if success_only is not None:
+        stmt = stmt.where(AuditLog.success == success_only)
+    if with_user:
+        stmt = stmt.options(selectinload(AuditLog.user))
+    if with_patient:
+        stmt = stmt.options(selectinload(AuditLog.patient))
+    stmt = stmt.order_by(AuditLog.created_at.desc()).offset(skip).limit(limit)
+    return list(db.execute(stmt).scalars())
@@ -2,12 +2,20 @@
 Configuration settings for Scribsy application
 """
 import os
+from functools import cached_property
 from typing import Optional
 try:
     from pydantic_settings import BaseSettings
 except ImportError:
     from pydantic import BaseSettings
 
+def _parse_csv(value: Optional[str]) -> frozenset:
+    """Comma-separated setting as a frozenset; empty or "*" means any"""
+    value = (value or "").strip()
+    if value == "*" or value == "":
+        return frozenset({"*"})
+    return frozenset(item.strip() for item in value.split(",") if item.strip())
+
 class Settings(BaseSettings):
     """Application settings"""
     
@@ -17,6 +25,12 @@ class Settings(BaseSettings):
     # Database Configuration
     # Use private endpoint to avoid egress fees and deployment issues
     database_url: str = "sqlite:///./scribsy.db"  # Will be overridden by get_database_url()
+    # Connection pool tuning (non-SQLite engines)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "25"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "25"))
+    db_pool_timeout: int = int(os.getenv("DB_POOL_TIMEOUT", "5"))  # seconds; fail fast instead of queueing
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds
+    db_migrate_on_startup: bool = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"  # run init_db in each worker
     
     # Authentication Configuration
     secret_key: str = os.getenv("SECRET_KEY", "supersecretkey")
@@ -24,6 +38,9 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))  # HIPAA: shorter sessions
     session_timeout_minutes: int = int(os.getenv("SESSION_TIMEOUT_MINUTES", "15"))  # HIPAA: auto-logout inactive sessions
     max_session_duration_hours: int = int(os.getenv("MAX_SESSION_DURATION_HOURS", "8"))  # HIPAA: max session length
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # work factor for new hashes (10-13)
+    bcrypt_cache_ttl: int = int(os.getenv("BCRYPT_CACHE_TTL", "300"))  # seconds a successful password check is reused
+    api_key_pepper: str = os.getenv("API_KEY_PEPPER", "")  # HMAC key for generated secrets; falls back to SECRET_KEY
     
     # Server Configuration
     debug: bool = os.getenv("DEBUG", "False").lower() == "true"
@@ -86,18 +103,14 @@ class Settings(BaseSettings):
         """Check if running in production mode"""
         return not self.debug and self.secret_key != "supersecretkey"
 
-    # Helpers
-    def allowed_origins_list(self) -> list:
-        value = (self.allowed_origins or "").strip()
-        if value == "*" or value == "":
-            return ["*"]
-        return [origin.strip() for origin in value.split(",") if origin.strip()]
+    # Helpers: parsed once per Settings instance; frozensets so CORS origin checks are O(1)
+    @cached_property
+    def allowed_origins_list(self) -> frozenset:
+        return _parse_csv(self.allowed_origins)
 
-    def allowed_hosts_list(self) -> list:
-        value = (self.allowed_hosts or "").strip()
-        if value == "*" or value == "":
-            return ["*"]
-        return [host.strip() for host in value.split(",") if host.strip()]
+    @cached_property
+    def allowed_hosts_list(self) -> frozenset:
+        return _parse_csv(self.allowed_hosts)
     
     def get_database_url(self) -> str:
         """Get database URL with Railway support"""
@@ -1,11 +1,15 @@
 """
 patients.py: CRUD operations for Patient model.
 """
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload
 from app.db import models, schemas
-from typing import List, Optional
-from datetime import datetime
-from sqlalchemy import and_
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import attrgetter
+from sqlalchemy import func, insert, lambda_stmt, literal_column, select, update
+from app.audit.models import get_utc_now
+from app.crud.notes import commit_keep_loaded, invalidate_tenant_statistics
 
 def create_patient(db: Session, patient: schemas.PatientCreate) -> models.Patient:
     """
@@ -13,25 +17,46 @@ def create_patient(db: Session, patient: schemas.PatientCreate) -> models.Patien
     """
     db_patient = models.Patient(**patient.model_dump())
     db.add(db_patient)
-    db.commit()
-    db.refresh(db_patient)
+    commit_keep_loaded(db)
     return db_patient
 
+def create_patients_bulk(db: Session, patients: List[schemas.PatientCreate]) -> List[int]:
+    """
+    Create many patients in one INSERT and commit once. Returns the new ids in input order.
+    """
+    if not patients:
+        return []
+    stmt = insert(models.Patient).returning(models.Patient.id, sort_by_parameter_order=True)
+    rows = [patient.model_dump() for patient in patients]
+    patient_ids = list(db.execute(stmt, rows).scalars())
+    db.commit()
+    invalidate_tenant_statistics(row.get("tenant_id") for row in rows)
+    return patient_ids
+
 def get_patient(db: Session, patient_id: int, user_id: int) -> Optional[models.Patient]:
     """
     Retrieve a patient by ID for a specific user.
     """
-    return db.query(models.Patient).filter(
-        models.Patient.id == patient_id,
-        models.Patient.user_id == user_id
-    ).first()
+    db_patient = db.get(models.Patient, patient_id)
+    if db_patient is None or db_patient.user_id != user_id:
+        return None
+    return db_patient
 
 def get_patient_by_id(db: Session, patient_id: int) -> Optional[models.Patient]:
     """
     Retrieve a patient by ID (no user filter).
     Intended for internal use where ownership was already validated upstream.
     """
-    return db.query(models.Patient).filter(models.Patient.id == patient_id).first()
+    return db.get(models.Patient, patient_id)
+
+# Must stay textually identical to the ix_patients_search_trgm expression in init_db;
+# the separators and '' are inlined literals so the planner can match the index
+_SPACE = literal_column("' '")
+PATIENT_SEARCH_TEXT = (
+    models.Patient.first_name + _SPACE + models.Patient.last_name
+    + _SPACE + func.coalesce(models.Patient.email, literal_column("''"))
+    + _SPACE + func.coalesce(models.Patient.phone_number, literal_column("''"))
+)
 
 def get_patients(
     db: Session, 
@@ -43,35 +68,42 @@ def get_patients(
     """
     Retrieve a list of patients for a specific user with optional search.
     """
-    query = db.query(models.Patient).filter(models.Patient.user_id == user_id)
+    # lambda_stmt caches the constructed statement per filter combination (see get_notes)
+    # raiseload("*") as in get_notes: patient.notes/appointments on a listed row raises
+    stmt = lambda_stmt(lambda: select(models.Patient).options(raiseload("*")).where(models.Patient.user_id == user_id))
     
     if search:
+        # One ILIKE over the combined fields rather than four; on PostgreSQL this expression
+        # is served by the ix_patients_search_trgm GIN index (created in init_db)
         search_term = f"%{search}%"
-        query = query.filter(
-            models.Patient.first_name.ilike(search_term) |
-            models.Patient.last_name.ilike(search_term) |
-            models.Patient.email.ilike(search_term) |
-            models.Patient.phone_number.ilike(search_term)
-        )
+        stmt += lambda s: s.where(PATIENT_SEARCH_TEXT.ilike(search_term))
     
-    return query.offset(skip).limit(limit).all()
+    stmt += lambda s: s.offset(skip).limit(limit)
+    return list(db.execute(stmt).scalars())
 
 def update_patient(db: Session, patient_id: int, patient: schemas.PatientUpdate, user_id: int) -> Optional[models.Patient]:
     """
     Update an existing patient for a specific user.
-    """
-    db_patient = get_patient(db, patient_id, user_id)
-    if db_patient:
-        # Use model_dump instead of deprecated dict() method
-        update_data = patient.model_dump(exclude_unset=True)
-        
-        for field, value in update_data.items():
-            if value is not None:  # Only update non-None values
-                setattr(db_patient, field, value)
-        
-        db_patient.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(db_patient)
+    One UPDATE ... RETURNING round-trip: no SELECT beforehand and no refresh afterwards.
+    """
+    # Only update non-None values
+    patch = {
+        field: value
+        for field, value in patient.model_dump(exclude_unset=True).items()
+        if value is not None
+    }
+    patch["updated_at"] = get_utc_now()
+    stmt = (
+        update(models.Patient)
+        .where(models.Patient.id == patient_id, models.Patient.user_id == user_id)
+        .values(**patch)
+        .returning(models.Patient)
+    )
+    db_patient = db.execute(stmt).scalar_one_or_none()
+    if db_patient is None:
+        db.rollback()
+        return None
+    commit_keep_loaded(db)
     return db_patient
 
 def delete_patient(db: Session, patient_id: int, user_id: int) -> bool:
@@ -139,20 +171,18 @@ def create_appointment(db: Session, user_id: int, appointment: schemas.Appointme
         status=getattr(appointment, 'status', None) or 'scheduled',
     )
     db.add(db_appt)
-    db.commit()
-    db.refresh(db_appt)
+    commit_keep_loaded(db)
     return db_appt
 
 def list_appointments(db: Session, user_id: int, patient_id: Optional[int] = None) -> List[models.Appointment]:
-    q = db.query(models.Appointment).filter(models.Appointment.user_id == user_id)
+    stmt = lambda_stmt(lambda: select(models.Appointment).where(models.Appointment.user_id == user_id))
     if patient_id is not None:
-        q = q.filter(models.Appointment.patient_id == patient_id)
-    return q.order_by(models.Appointment.scheduled_at.asc()).all()
+        stmt += lambda s: s.where(models.Appointment.patient_id == patient_id)
+    stmt += lambda s: s.order_by(models.Appointment.scheduled_at.asc())
+    return list(db.execute(stmt).scalars())
 
 def delete_appointment(db: Session, user_id: int, appt_id: int) -> bool:
-    appt = db.query(models.Appointment).filter(
-        and_(models.Appointment.id == appt_id, models.Appointment.user_id == user_id)
-    ).first()
+    appt = get_appointment(db, user_id, appt_id)
     if not appt:
         return False
     db.delete(appt)
@@ -160,9 +190,11 @@ def delete_appointment(db: Session, user_id: int, appt_id: int) -> bool:
     return True
 
 def get_appointment(db: Session, user_id: int, appt_id: int) -> Optional[models.Appointment]:
-    return db.query(models.Appointment).filter(
-        and_(models.Appointment.id == appt_id, models.Appointment.user_id == user_id)
-    ).first()
+    # Primary-key lookup (identity map first); ownership checked on the loaded row
+    appt = db.get(models.Appointment, appt_id)
+    if appt is None or appt.user_id != user_id:
+        return None
+    return appt
 
 def update_appointment(db: Session, user_id: int, appt_id: int, update: schemas.AppointmentUpdate) -> Optional[models.Appointment]:
     appt = get_appointment(db, user_id, appt_id)
@@ -170,8 +202,7 @@ def update_appointment(db: Session, user_id: int, appt_id: int, update: schemas.
         return None
     for field, value in update.model_dump(exclude_unset=True).items():
         setattr(appt, field, value)
-    db.commit()
-    db.refresh(appt)
+    commit_keep_loaded(db)
     return appt
 
 def check_in_appointment(db: Session, user_id: int, appt_id: int) -> Optional[models.Appointment]:
@@ -185,23 +216,36 @@ def check_in_appointment(db: Session, user_id: int, appt_id: int) -> Optional[mo
         appt.checked_in_at = datetime.now(timezone.utc)
     except Exception:
         appt.checked_in_at = datetime.utcnow()
-    db.commit()
-    db.refresh(appt)
+    commit_keep_loaded(db)
     return appt
 
-def list_upcoming_appointments(db: Session, user_id: int, within_hours: int = 168) -> List[models.Appointment]:
-    from datetime import datetime, timedelta
+def list_upcoming_appointments_bulk(
+    db: Session, user_ids: Iterable[int], within_hours: int = 168
+) -> Dict[int, List[models.Appointment]]:
+    """
+    Upcoming appointments for several users in one query, grouped by user_id.
+    The IN list is an expanding bind parameter, so the statement compiles once
+    whatever the number of users. Users with nothing upcoming map to an empty list.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
     now = datetime.utcnow()
     window = now + timedelta(hours=within_hours)
-    return (
+    appointments = (
         db.query(models.Appointment)
         .filter(
-            and_(
-                models.Appointment.user_id == user_id,
-                models.Appointment.scheduled_at >= now,
-                models.Appointment.scheduled_at <= window,
-            )
+            models.Appointment.user_id.in_(user_ids),
+            models.Appointment.scheduled_at >= now,
+            models.Appointment.scheduled_at <= window,
         )
-        .order_by(models.Appointment.scheduled_at.asc())
+        .order_by(models.Appointment.user_id, models.Appointment.scheduled_at.asc())
         .all()
-    )
\ No newline at end of file
+    )
+    upcoming: Dict[int, List[models.Appointment]] = {user_id: [] for user_id in user_ids}
+    for user_id, group in groupby(appointments, key=attrgetter("user_id")):
+        upcoming[user_id] = list(group)
+    return upcoming
+
+def list_upcoming_appointments(db: Session, user_id: int, within_hours: int = 168) -> List[models.Appointment]:
+    return list_upcoming_appointments_bulk(db, [user_id], within_hours)[user_id]
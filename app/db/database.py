@@ -1,8 +1,10 @@
 """
 database.py: Database connection setup for SQLite using SQLAlchemy.
 """
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
 import os
 
 # Database URL from configuration
@@ -12,23 +14,104 @@ DATABASE_URL = settings.get_database_url()
 # Configure engine based on database type
 if DATABASE_URL.startswith("sqlite"):
     # SQLite configuration
+    # An in-memory database exists per connection, so every session must share the one connection
+    in_memory = DATABASE_URL in ("sqlite://", "sqlite:///:memory:")
     engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        query_cache_size=1200,
+        **({"poolclass": StaticPool} if in_memory else {}),
     )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        Per-connection SQLite tuning. WAL lets readers run alongside the writer instead of
+        blocking on the rollback journal; synchronous=NORMAL is durable under WAL except on
+        power loss. Cache is 64 MB (negative = KiB), mmap 256 MB.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
 else:
     # PostgreSQL/other databases configuration
-    engine = create_engine(DATABASE_URL)
+    # executemany_mode is psycopg2-only; SQLAlchemy 2.1 resolves bare postgresql:// to psycopg 3
+    psycopg2_args = {}
+    if make_url(DATABASE_URL).get_driver_name() == "psycopg2":
+        psycopg2_args["executemany_mode"] = "values_plus_batch"
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=True,
+        # Reuse the most recently returned connection; idle extras age out via pool_recycle
+        pool_use_lifo=True,
+        query_cache_size=1200,
+        # Bulk note/provenance inserts batch 1000 rows per INSERT ... VALUES; psycopg2 also
+        # batches executemany UPDATE/DELETE instead of sending one round trip per row
+        insertmanyvalues_page_size=1000,
+        **psycopg2_args,
+    )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 # Import models to register them with Base
 from app.db import models  # noqa: F401
+# Configure every mapper now (relationship resolution, string lookups) so the first
+# request's query doesn't pay for it and mapping errors surface at import
+Base.registry.configure()
+
+# (table, column, type it had before, ALTER TABLE clause) for init_db on PostgreSQL
+_COLUMN_TYPE_MIGRATIONS = (
+    ("users", "is_active", "integer",
+     "ALTER COLUMN is_active DROP DEFAULT, ALTER COLUMN is_active TYPE boolean USING is_active::boolean"),
+    ("users", "is_admin", "integer",
+     "ALTER COLUMN is_admin DROP DEFAULT, ALTER COLUMN is_admin TYPE boolean USING is_admin::boolean"),
+    ("users", "failed_login_attempts", "integer", "ALTER COLUMN failed_login_attempts TYPE smallint"),
+    ("notes", "file_size", "integer", "ALTER COLUMN file_size TYPE bigint"),
+    ("notes", "audio_retention_days", "integer", "ALTER COLUMN audio_retention_days TYPE smallint"),
+    ("appointments", "notify_before_minutes", "integer", "ALTER COLUMN notify_before_minutes TYPE smallint"),
+)
 
 def init_db():
     """
     Create all tables in the database.
     """
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes on tables that already exist; add any that are missing
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception:
+                pass  # Best-effort, like the column migrations below
+    # Users columns added after the first deployments; probing one of them is enough
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("SELECT role FROM users LIMIT 1"))
+        except Exception:
+            conn.rollback()
+            for migration in (
+                "ALTER TABLE users ADD COLUMN role VARCHAR DEFAULT 'provider'",
+                "ALTER TABLE users ADD COLUMN last_login TIMESTAMP",
+                "ALTER TABLE users ADD COLUMN failed_login_attempts INTEGER DEFAULT 0",
+                "ALTER TABLE users ADD COLUMN account_locked_until TIMESTAMP",
+                "ALTER TABLE users ADD COLUMN work_start_time VARCHAR DEFAULT '09:00'",
+                "ALTER TABLE users ADD COLUMN work_end_time VARCHAR DEFAULT '17:00'",
+                "ALTER TABLE users ADD COLUMN timezone VARCHAR DEFAULT 'UTC'",
+                "ALTER TABLE users ADD COLUMN working_days VARCHAR DEFAULT '1,2,3,4,5'",
+            ):
+                try:
+                    with conn.begin():
+                        conn.execute(text(migration))
+                except Exception:
+                    pass  # Column already exists
     # Lightweight startup migrations for SQLite dev
     try:
         if DATABASE_URL.startswith("sqlite"):
@@ -47,9 +130,46 @@ def init_db():
                     conn.execute(text("ALTER TABLE appointments ADD COLUMN status VARCHAR NOT NULL DEFAULT 'scheduled'"))
                 if "checked_in_at" not in cols:
                     conn.execute(text("ALTER TABLE appointments ADD COLUMN checked_in_at DATETIME NULL"))
+        else:
+            # Audit timestamps moved to server defaults; apply them to existing tables that
+            # still lack one (each ALTER takes an ACCESS EXCLUSIVE lock, so not on every boot)
+            with engine.begin() as conn:
+                missing_default = conn.execute(text(
+                    "SELECT table_name FROM information_schema.columns "
+                    "WHERE table_name IN ('audit_logs', 'login_attempts', 'data_retention_policies') "
+                    "AND column_name = 'created_at' AND column_default IS NULL"
+                )).scalars().all()
+                for table in missing_default:
+                    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN created_at SET DEFAULT now()"))
+            # Convert columns whose type changed after their tables were created; each only
+            # while it still has the old type, since ALTER ... TYPE rewrites the table
+            with engine.begin() as conn:
+                current_types = {
+                    (row.table_name, row.column_name): row.data_type
+                    for row in conn.execute(text(
+                        "SELECT table_name, column_name, data_type FROM information_schema.columns "
+                        "WHERE table_name IN ('users', 'notes', 'appointments')"
+                    ))
+                }
+                for table, column, old_type, alter in _COLUMN_TYPE_MIGRATIONS:
+                    if current_types.get((table, column)) == old_type:
+                        conn.execute(text(f"ALTER TABLE {table} {alter}"))
     except Exception:
         # Best-effort; avoid blocking app startup in dev
         pass
+    if not DATABASE_URL.startswith("sqlite"):
+        # Trigram index for the patient search in crud/patients.get_patients; the expression
+        # must match PATIENT_SEARCH_TEXT there. Skipped where pg_trgm can't be installed.
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_patients_search_trgm ON patients USING gin "
+                    "((first_name || ' ' || last_name || ' ' || coalesce(email, '') || ' ' "
+                    "|| coalesce(phone_number, '')) gin_trgm_ops)"
+                ))
+        except Exception:
+            pass
 
 def get_db():
     db = SessionLocal()
@@ -1,22 +1,18 @@
 """
 models.py: Defines SQLAlchemy ORM models for the database.
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Date, Boolean, Float
-from sqlalchemy.orm import relationship
-import datetime
-import pytz
+from sqlalchemy import Column, BigInteger, Integer, SmallInteger, String, DateTime, ForeignKey, Text, Date, Boolean, Float, Index, func, text
+from sqlalchemy.orm import deferred, relationship
+from typing import Iterable, Tuple
 from app.db.database import Base
 
-# Import audit models to ensure they're available during table creation
-from app.audit.models import AuditLog, LoginAttempt, DataRetentionPolicy
+# Import audit models to ensure they're available during table creation.
+# get_utc_now (stdlib timezone.utc, no pytz) is shared by every created_at/updated_at default.
+from app.audit.models import AuditLog, LoginAttempt, DataRetentionPolicy, get_utc_now
 
 # Import nudge models to ensure they're available during table creation
 from app.db.nudge_models import NudgeLog, NotificationPreference, ScheduledNudge, UserStatus, NudgeRule
 
-def get_utc_now():
-    """Get current UTC time with timezone info"""
-    return datetime.datetime.now(pytz.UTC)
-
 class Patient(Base):
     """
     SQLAlchemy model for a patient.
@@ -50,13 +46,38 @@ class Note(Base):
     SQLAlchemy model for a note.
     """
     __tablename__ = "notes"
+    __auditable__ = "note"  # create/update/delete audited at flush (app/audit/models.py)
+    __table_args__ = (
+        # Serves the per-provider "pending notes today" queries in working_hours
+        Index("ix_notes_provider_status_created", "provider_id", "status", "created_at"),
+        # MAX(updated_at) per provider for the finalization-warning ETag
+        Index("ix_notes_provider_updated", "provider_id", "updated_at"),
+        # Index-only MAX(visit_id) per patient per day for next_visit_id
+        Index("ix_notes_patient_created_visit", "patient_id", "created_at", "visit_id"),
+        # Newest-first note listings per provider (get_notes); per-patient listings use the index above
+        Index("ix_notes_provider_created", "provider_id", "created_at"),
+        # get_notes is always provider-scoped; a patient filter within it seeks here instead
+        # of walking all of the provider's notes
+        Index("ix_notes_provider_patient_created", "provider_id", "patient_id", "created_at"),
+        # Tenant-scoped provider listings (TenantIsolation.get_tenant_notes)
+        Index("ix_notes_tenant_provider_created", "tenant_id", "provider_id", "created_at"),
+        # Audio still awaiting secure deletion, by due date (audio retention sweep); most notes
+        # have no audio deadline or were already wiped, so the index holds only the backlog
+        Index(
+            "ix_notes_audio_pending_delete", "audio_deleted_at",
+            postgresql_where=text("audio_deleted_at IS NOT NULL AND audio_secure_deleted = false"),
+            sqlite_where=text("audio_deleted_at IS NOT NULL AND audio_secure_deleted = 0"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), index=True, nullable=False)
     provider_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
     visit_id = Column(Integer, index=True, nullable=False)
     note_type = Column(String, nullable=False) #Progress, discharge,admission, consult,etc.
-    content = Column(Text, nullable=False)
+    # Large Text columns are deferred as one "body" group: list/ownership/timing queries skip
+    # them, the first access loads the whole group, and full reads undefer_group("body")
+    content = deferred(Column(Text, nullable=False), group="body")
     created_at = Column(DateTime(timezone=True), default=get_utc_now, nullable=False)
     updated_at = Column(DateTime(timezone=True), default=get_utc_now, onupdate=get_utc_now, nullable=False)
     signed_at = Column(DateTime(timezone=True), nullable=True)
@@ -64,19 +85,19 @@ class Note(Base):
 
     audio_file = Column(String, nullable=True)  # Path or URL to uploaded audio file
     s3_key = Column(String, nullable=True)  # S3 object key if stored in S3
-    file_size = Column(Integer, nullable=True)  # File size in bytes
+    file_size = Column(BigInteger, nullable=True)  # File size in bytes; audio can exceed 2 GB
     content_type = Column(String, nullable=True)  # MIME type of the audio file
     storage_provider = Column(String, nullable=True, default="local")  # "local" or "s3"
     
     # Transcription and AI processing fields
-    transcript = Column(Text, nullable=True)  # Full transcribed conversation
-    soap_subjective = Column(Text, nullable=True)  # SOAP: Subjective
-    soap_objective = Column(Text, nullable=True)  # SOAP: Objective  
-    soap_assessment = Column(Text, nullable=True)  # SOAP: Assessment
-    soap_plan = Column(Text, nullable=True)  # SOAP: Plan
+    transcript = deferred(Column(Text, nullable=True), group="body")  # Full transcribed conversation
+    soap_subjective = deferred(Column(Text, nullable=True), group="body")  # SOAP: Subjective
+    soap_objective = deferred(Column(Text, nullable=True), group="body")  # SOAP: Objective
+    soap_assessment = deferred(Column(Text, nullable=True), group="body")  # SOAP: Assessment
+    soap_plan = deferred(Column(Text, nullable=True), group="body")  # SOAP: Plan
     
     # AI accuracy tracking
-    original_content = Column(Text, nullable=True)  # Original AI-generated content
+    original_content = deferred(Column(Text, nullable=True), group="body")  # Original AI-generated content
     accuracy_score = Column(Float, nullable=True, default=100.0)  # Accuracy percentage (0-100)
     content_changes_count = Column(Integer, nullable=True, default=0)  # Number of times content was modified
     
@@ -94,7 +115,7 @@ class Note(Base):
     lock_expires_at = Column(DateTime(timezone=True), nullable=True)
     
     # Audio retention and secure delete
-    audio_retention_days = Column(Integer, nullable=True, default=30)  # Default 30 days
+    audio_retention_days = Column(SmallInteger, nullable=True, default=30)  # Default 30 days
     audio_deleted_at = Column(DateTime(timezone=True), nullable=True)
     audio_secure_deleted = Column(Boolean, default=False)
     
@@ -116,6 +137,10 @@ class Appointment(Base):
     Notifies medical personnel notify_before_minutes before scheduled_at.
     """
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Per-user listings ordered by time and the upcoming-window scan (crud/patients.py)
+        Index("ix_appointments_user_scheduled", "user_id", "scheduled_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), index=True, nullable=False)
@@ -123,7 +148,7 @@ class Appointment(Base):
     title = Column(String, nullable=True)
     note = Column(Text, nullable=True)
     scheduled_at = Column(DateTime(timezone=True), nullable=False)
-    notify_before_minutes = Column(Integer, default=30, nullable=False)
+    notify_before_minutes = Column(SmallInteger, default=30, nullable=False)
     notified = Column(Boolean, default=False, nullable=False)
     # Visit flow
     status = Column(String, nullable=False, default="scheduled")  # scheduled, checked_in, in_progress, completed, cancelled
@@ -201,17 +226,20 @@ class NoteComment(Base):
 
 class User(Base):
     __tablename__ = "users"
+    __auditable__ = "user"
+    # Login bookkeeping is covered by LoginAttempt rather than per-flush audit rows
+    __audit_ignore__ = frozenset({"last_login", "failed_login_attempts", "account_locked_until"})
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)  # Add email field
-    is_active = Column(Integer, default=1)
-    is_admin = Column(Integer, default=0)  # 0 = regular user, 1 = admin
+    is_active = Column(Boolean, default=True)
+    is_admin = Column(Boolean, default=False)
     
     # HIPAA Role-based access control
     role = Column(String, default="provider")  # provider, admin, auditor, read_only
     last_login = Column(DateTime(timezone=True), nullable=True)
-    failed_login_attempts = Column(Integer, default=0)
+    failed_login_attempts = Column(SmallInteger, default=0)
     account_locked_until = Column(DateTime(timezone=True), nullable=True)
     
     # Tenant isolation
@@ -223,6 +251,20 @@ class User(Base):
     timezone = Column(String, default="UTC")          # User's timezone
     working_days = Column(String, default="1,2,3,4,5")  # Comma-separated: 1=Monday, 7=Sunday
     
+    @property
+    def working_days_list(self) -> Tuple[int, ...]:
+        """Parsed working_days, memoized on the instance until the string changes"""
+        raw = self.working_days or ""
+        cached = getattr(self, "_working_days_parsed", None)
+        if cached is None or cached[0] != raw:
+            cached = (raw, tuple(int(day) for day in raw.split(",") if day))
+            self._working_days_parsed = cached
+        return cached[1]
+    
+    @working_days_list.setter
+    def working_days_list(self, days: Iterable[int]):
+        self.working_days = ",".join(map(str, days))
+    
     notes = relationship("Note", foreign_keys="Note.provider_id", back_populates="user")
     patients = relationship("Patient", back_populates="user")
     audit_logs = relationship("AuditLog", back_populates="user")
@@ -234,6 +276,12 @@ class User(Base):
     # Password reset tokens
     password_reset_tokens = relationship("PasswordResetToken", back_populates="user", cascade="all, delete-orphan")
 
+# Expression index matching get_user_by_username's lower(trim(username)) lookup, so login
+# is an index seek rather than a scan. Not unique: legacy rows may differ only by case.
+Index("ix_users_username_normalized", func.lower(func.trim(User.username)))
+# Same for the case-insensitive email lookups (registration, Clerk mapping, password reset)
+Index("ix_users_email_lower", func.lower(User.email))
+
 class PasswordResetToken(Base):
     """
     Model for storing password reset verification tokens
@@ -4,12 +4,11 @@ Database models for the nudge/notification system
 from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON
 from sqlalchemy.orm import relationship
 from app.db.database import Base
-from datetime import datetime
-import pytz
+from datetime import datetime, timezone
 
 def get_utc_now():
     """Get current UTC time with timezone info"""
-    return datetime.now(pytz.UTC)
+    return datetime.now(timezone.utc)
 
 class NudgeLog(Base):
     """Track nudges sent to users"""
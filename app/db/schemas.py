@@ -1,7 +1,7 @@
 """
 schemas.py: Defines Pydantic schemas for request/response validation.
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, date
 
@@ -51,7 +51,7 @@ class AppointmentBase(BaseModel):
     scheduled_at: datetime
     title: Optional[str] = None
     note: Optional[str] = None
-    notify_before_minutes: int = 30
+    notify_before_minutes: int = Field(30, ge=0, le=32767)  # SMALLINT column
     status: Optional[str] = None
     checked_in_at: Optional[datetime] = None
 
@@ -72,7 +72,7 @@ class AppointmentUpdate(BaseModel):
     title: Optional[str] = None
     note: Optional[str] = None
     scheduled_at: Optional[datetime] = None
-    notify_before_minutes: Optional[int] = None
+    notify_before_minutes: Optional[int] = Field(None, ge=0, le=32767)
 
 class NoteBase(BaseModel):
     patient_id: int
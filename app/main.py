@@ -57,6 +57,14 @@ def _load_sentry():
     except Exception:
         return (None, None, None)
 
+def _load_default_response_class():
+    # orjson is optional; fall back to the stdlib-backed JSONResponse without it
+    try:
+        importlib.import_module('orjson')
+        return importlib.import_module('fastapi.responses').ORJSONResponse
+    except Exception:
+        return JSONResponse
+
 load_dotenv()
 
 # Initialize Sentry if configured
@@ -69,7 +77,11 @@ if settings.sentry_dsn and _sentry_sdk and _SentryFastApiIntegration and _Sentry
         environment=settings.sentry_environment,
     )
 
-app = FastAPI(title="Scribsy", redirect_slashes=False)
+app = FastAPI(
+    title="Scribsy",
+    redirect_slashes=False,
+    default_response_class=_load_default_response_class(),
+)
 
 # Global exception handler for ScribsyException
 @app.exception_handler(ScribsyException)
@@ -94,7 +106,7 @@ if settings.https_redirect and not settings.debug:
     app.add_middleware(HTTPSRedirectMiddleware)
 
 # CORS - configured via env
-allowed_origins = settings.allowed_origins_list()
+allowed_origins = settings.allowed_origins_list
 allow_credentials = False if "*" in allowed_origins else True
 app.add_middleware(
     CORSMiddleware,
@@ -115,9 +127,9 @@ app.add_middleware(SlowAPIMiddleware)
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # Trusted hosts and proxy headers
-allowed_hosts = settings.allowed_hosts_list()
-if allowed_hosts != ["*"]:
-    app.add_middleware(TrustedHostMiddleware, allowed_hosts=allowed_hosts)
+allowed_hosts = settings.allowed_hosts_list
+if "*" not in allowed_hosts:
+    app.add_middleware(TrustedHostMiddleware, allowed_hosts=sorted(allowed_hosts))
 
 # Honor X-Forwarded-* from platform proxy (if available without static import)
 _ProxyHeadersMiddleware = None
@@ -227,6 +239,9 @@ class SessionTimeoutMiddleware(BaseHTTPMiddleware):
             if token:
                 try:
                     payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+                    # Share the decoded claims with get_current_user so it doesn't decode again
+                    request.state.jwt_token = token
+                    request.state.jwt_claims = payload
                     issued_at = payload.get("iat", None)
                     # Backward-compatibility: if token has no iat (older tokens), skip max-duration enforcement
                     if issued_at is not None:
@@ -285,54 +300,37 @@ app.include_router(emergency_auth_router)
 def on_startup():
     """Initialize database tables on application startup."""
     try:
-        init_db()
-        # Reduced logging for Railway rate limits
-        # logger.info("Database initialized (tables ensured)")
-        
-        # Run one-time migration to fix missing columns (reduced logging)
-        try:
-            from sqlalchemy import text
-            from app.db.database import engine
-            
-            # Check if migration is needed by checking if role column exists
-            with engine.connect() as conn:
-                try:
-                    result = conn.execute(text("SELECT role FROM users LIMIT 1"))
-                    # If this succeeds, columns already exist
-                    # logger.info("Database schema up to date")
-                except Exception:
-                    # Columns don't exist, run migration
-                    migrations = [
-                        "ALTER TABLE users ADD COLUMN role VARCHAR DEFAULT 'provider';",
-                        "ALTER TABLE users ADD COLUMN last_login TIMESTAMP;",
-                        "ALTER TABLE users ADD COLUMN failed_login_attempts INTEGER DEFAULT 0;",
-                        "ALTER TABLE users ADD COLUMN account_locked_until TIMESTAMP;",
-                        "ALTER TABLE users ADD COLUMN work_start_time VARCHAR DEFAULT '09:00';",
-                        "ALTER TABLE users ADD COLUMN work_end_time VARCHAR DEFAULT '17:00';",
-                        "ALTER TABLE users ADD COLUMN timezone VARCHAR DEFAULT 'UTC';",
-                        "ALTER TABLE users ADD COLUMN working_days VARCHAR DEFAULT '1,2,3,4,5';",
-                    ]
-                    
-                    trans = conn.begin()
-                    try:
-                        for migration in migrations:
-                            try:
-                                conn.execute(text(migration))
-                            except Exception:
-                                # Ignore duplicate column errors silently
-                                pass
-                        trans.commit()
-                        # logger.info("Database migration completed")
-                    except Exception as e:
-                        trans.rollback()
-                        logger.error(f"Migration failed: {e}")
-                    
-        except Exception as e:
-            logger.error(f"Migration error: {e}")
-            
+        # Schema setup/migrations; deployments that run init_db once before starting the
+        # workers (start_railway_simple.sh) set DB_MIGRATE_ON_STARTUP=false to skip this
+        if settings.db_migrate_on_startup:
+            init_db()
+        # Batch audit log writes from here on
+        from app.audit.bulk import audit_writer
+        audit_writer.start()
     except Exception as e:
         log_error(e, context="DB init on startup")
 
+@app.on_event("startup")
+async def open_s3_client():
+    """Open the shared async S3 client (only when aioboto3 is installed and S3 is reachable)."""
+    from app.services.s3_service import s3_service
+    try:
+        await s3_service.start()
+    except Exception as e:
+        log_error(e, context="S3 client on startup")
+
+@app.on_event("shutdown")
+def on_shutdown():
+    """Flush audit log entries still waiting in the batch writer."""
+    from app.audit.bulk import audit_writer
+    audit_writer.stop()
+
+@app.on_event("shutdown")
+async def close_s3_client():
+    """Close the shared async S3 client."""
+    from app.services.s3_service import s3_service
+    await s3_service.close()
+
 @app.get("/")
 def root():
     logger.info("Root endpoint accessed")
@@ -364,11 +362,12 @@ def readyz():
     except Exception as e:
         return JSONResponse(status_code=503, content={"status": "db_unavailable", "error": str(e)})
 
-    # Check S3 if enabled
-    if settings.use_s3 and not s3_service.is_available():
+    # Check S3 if enabled; re-probe while it's down so a failure at startup can recover
+    if settings.use_s3 and not s3_service.is_available() and not s3_service.refresh_availability():
         return JSONResponse(status_code=503, content={"status": "s3_unavailable"})
 
-    return {"status": "ready"}
+    # Checked-in/overflow counts help spot pool exhaustion (DB_POOL_* settings)
+    return {"status": "ready", "db_pool": engine.pool.status()}
 
 @app.get("/test-env")
 def test_env():
@@ -1,10 +1,25 @@
 from pydantic import BaseModel, ValidationError
-from openai import OpenAI
+from openai import AsyncOpenAI
 import os
 import json
+import hashlib
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from typing import Optional
+from app.utils.cache import TTLCache
+
+# Shared async client, created on first use so importing this module never needs an API key
+_client: Optional[AsyncOpenAI] = None
+
+def _get_client() -> AsyncOpenAI:
+    global _client
+    if _client is None:
+        from app.config import settings
+        _client = AsyncOpenAI(api_key=settings.openai_api_key or os.getenv("OPENAI_API_KEY"))
+    return _client
+
+# Summaries keyed by sha256(transcript + preferences); identical re-uploads skip the LLM call
+_summary_cache = TTLCache(maxsize=1024, ttl=86400)
 
 class NoteSummary(BaseModel):
     subjective: str
@@ -84,13 +99,8 @@ Plan: ...
 async def summarize_note(user_message: str, db: Optional[Session] = None,
                         patient_id: Optional[int] = None, visit_id: Optional[int] = None,
                         preferences: Optional[dict] = None) -> NoteSummary:
-    from app.config import settings
-    # Initialize OpenAI client once per process
-    global client
-    try:
-        client
-    except NameError:
-        client = OpenAI(api_key=settings.openai_api_key or os.getenv("OPENAI_API_KEY"))
+    # One client (and its connection pool) per process; awaited so the event loop isn't blocked
+    client = _get_client()
 
     # Optional RAG service; guard import to avoid hard dependency
     rag_service = None
@@ -114,7 +124,7 @@ async def summarize_note(user_message: str, db: Optional[Session] = None,
             context = rag_service.get_patient_context(db, patient_id, visit_id, user_message)
             contextual_prompt = rag_service.create_contextual_prompt(user_message, context)
             
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model="gpt-4o",
                 messages=[
                     {
@@ -128,7 +138,7 @@ async def summarize_note(user_message: str, db: Optional[Session] = None,
         except Exception as e:
             print(f"RAG context retrieval failed: {e}, falling back to basic summarization")
             # Fall back to basic summarization if RAG fails
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model="gpt-4o",
                 messages=[
                     {
@@ -141,7 +151,7 @@ async def summarize_note(user_message: str, db: Optional[Session] = None,
             )
     else:
         # Basic summarization without RAG context
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model="gpt-4o",
             messages=[
                 {
@@ -177,3 +187,19 @@ async def summarize_note(user_message: str, db: Optional[Session] = None,
             summary_data[current_key] += " " + line.strip()
 
     return NoteSummary(**summary_data)
+
+
+def _summary_cache_key(transcript: str, preferences: Optional[dict]) -> str:
+    prefs = json.dumps(preferences or {}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{transcript}\x00{prefs}".encode("utf-8")).hexdigest()
+
+
+async def summarize_note_cached(transcript: str, preferences: Optional[dict] = None) -> NoteSummary:
+    """summarize_note without RAG context, memoized per transcript/preferences hash."""
+    key = _summary_cache_key(transcript, preferences)
+    cached = _summary_cache.get(key)
+    if cached is not None:
+        return cached.model_copy()
+    summary = await summarize_note(transcript, preferences=preferences)
+    _summary_cache.set(key, summary)
+    return summary.model_copy()
@@ -5,7 +5,10 @@ Handles automated data lifecycle management according to HIPAA requirements
 from datetime import datetime, timedelta
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, delete, func, select
+import gzip
+import io
+import json
 import logging
 import pytz
 
@@ -32,6 +35,9 @@ class HIPAADataRetentionService:
     AUDIT_LOG_RETENTION_DAYS = 2555  # 7 years for audit logs
     MINIMUM_RETENTION_DAYS = 2190  # 6 years minimum
     
+    # Expired audit logs are archived and deleted in id-ordered batches of this size
+    AUDIT_LOG_BATCH_SIZE = 5000
+    
     def __init__(self, db: Session):
         self.db = db
     
@@ -53,9 +59,11 @@ class HIPAADataRetentionService:
             retention_period_days = self.MINIMUM_RETENTION_DAYS
         
         # Calculate deletion date
-        deletion_scheduled_at = datetime.now(pytz.UTC) + timedelta(days=retention_period_days)
+        now = datetime.now(pytz.UTC)
+        deletion_scheduled_at = now + timedelta(days=retention_period_days)
         
         policy = DataRetentionPolicy(
+            created_at=now,  # SQLite tables created before the server default have none
             resource_type=resource_type,
             resource_id=resource_id,
             retention_period_days=retention_period_days,
@@ -219,17 +227,46 @@ class HIPAADataRetentionService:
             self.db.rollback()
             return False
     
+    def _archive_audit_batch(self, rows: list) -> bool:
+        """
+        Copy a batch of expired audit rows to S3 as gzipped JSON lines before deletion.
+        Returns False if S3 is configured but the upload failed, so nothing is deleted
+        without an archive; without S3 the rows are deleted as before.
+        """
+        # Imported here: s3_service connects to the bucket at import time
+        from app.services.s3_service import s3_service, UPLOAD_TRANSFER_CONFIG
+        
+        if not s3_service.is_available():
+            return True
+        
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as archive:
+            for row in rows:
+                archive.write(json.dumps(dict(row), default=str).encode() + b"\n")
+        buffer.seek(0)
+        
+        first_row = rows[0]
+        s3_key = f"audit-archive/{first_row['created_at']:%Y/%m}/audit_logs_{first_row['id']}-{rows[-1]['id']}.jsonl.gz"
+        try:
+            s3_service.s3_client.upload_fileobj(
+                buffer,
+                s3_service.bucket_name,
+                s3_key,
+                ExtraArgs={"ContentType": "application/gzip"},
+                Config=UPLOAD_TRANSFER_CONFIG
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to archive audit logs to {s3_key}: {str(e)}")
+            return False
+    
     def cleanup_old_audit_logs(self, user_id: int) -> int:
-        """Clean up audit logs older than retention period"""
+        """Archive and delete audit logs older than retention period, in batches"""
         try:
             cutoff_date = datetime.now(pytz.UTC) - timedelta(days=self.AUDIT_LOG_RETENTION_DAYS)
+            expired = AuditLog.created_at < cutoff_date
             
-            # Get old audit logs
-            old_logs = self.db.query(AuditLog).filter(
-                AuditLog.created_at < cutoff_date
-            ).all()
-            
-            count = len(old_logs)
+            count = self.db.execute(select(func.count()).where(expired)).scalar()
             
             if count > 0:
                 user = self.db.query(User).filter(User.id == user_id).first()
@@ -245,12 +282,20 @@ class HIPAADataRetentionService:
                     description=f"Automated cleanup of {count} old audit logs (older than {self.AUDIT_LOG_RETENTION_DAYS} days)"
                 )
                 
-                # Delete old logs
-                for log in old_logs:
-                    self.db.delete(log)
+                # Set-based deletes per batch instead of loading every expired row into the session
+                deleted = 0
+                while True:
+                    rows = self.db.execute(
+                        select(AuditLog.__table__).where(expired).order_by(AuditLog.id).limit(self.AUDIT_LOG_BATCH_SIZE)
+                    ).mappings().all()
+                    if not rows or not self._archive_audit_batch(rows):
+                        break
+                    self.db.execute(delete(AuditLog).where(AuditLog.id.in_([row["id"] for row in rows])))
+                    self.db.commit()
+                    deleted += len(rows)
                 
-                self.db.commit()
-                logger.info(f"Cleaned up {count} old audit logs")
+                logger.info(f"Cleaned up {deleted} of {count} old audit logs")
+                return deleted
             
             return count
             
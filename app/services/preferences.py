@@ -6,10 +6,13 @@ import json
 import os
 from typing import Any, Dict, Optional
 from threading import Lock
+from app.utils.cache import TTLCache
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'data')
 PREFS_PATH = os.path.abspath(os.path.join(DATA_DIR, 'user_prefs.json'))
 _lock = Lock()
+# Merged preferences per user; invalidated on save/reset, TTL bounds staleness across workers
+_prefs_cache = TTLCache(maxsize=1024, ttl=60)
 
 DEFAULT_PREFS: Dict[str, Any] = {
     "format": "soap",              # soap | narrative | bulleted
@@ -29,6 +32,9 @@ def _ensure_file():
             json.dump({}, f)
 
 def load_user_preferences(user_id: int) -> Dict[str, Any]:
+    cached = _prefs_cache.get(user_id)
+    if cached is not None:
+        return { **cached }
     _ensure_file()
     with _lock:
         try:
@@ -39,7 +45,8 @@ def load_user_preferences(user_id: int) -> Dict[str, Any]:
     prefs = data.get(str(user_id)) or {}
     # Merge with defaults
     merged = { **DEFAULT_PREFS, **prefs }
-    return merged
+    _prefs_cache.set(user_id, merged)
+    return { **merged }
 
 def save_user_preferences(user_id: int, prefs: Dict[str, Any]) -> Dict[str, Any]:
     _ensure_file()
@@ -51,10 +58,12 @@ def save_user_preferences(user_id: int, prefs: Dict[str, Any]) -> Dict[str, Any]
             data = {}
         # Only allow known keys
         clean = { k: v for k, v in prefs.items() if k in DEFAULT_PREFS }
-        merged = { **load_user_preferences(user_id), **clean }
+        # Merge from the data already read; load_user_preferences would re-acquire _lock
+        merged = { **DEFAULT_PREFS, **(data.get(str(user_id)) or {}), **clean }
         data[str(user_id)] = merged
         with open(PREFS_PATH, 'w', encoding='utf-8') as f:
             json.dump(data, f)
+        _prefs_cache.pop(user_id)
     return merged
 
 def reset_user_preferences(user_id: int) -> Dict[str, Any]:
@@ -68,6 +77,7 @@ def reset_user_preferences(user_id: int) -> Dict[str, Any]:
         data[str(user_id)] = DEFAULT_PREFS.copy()
         with open(PREFS_PATH, 'w', encoding='utf-8') as f:
             json.dump(data, f)
+        _prefs_cache.pop(user_id)
     return DEFAULT_PREFS.copy()
 
 
@@ -1,7 +1,10 @@
 """
 S3 service for handling file storage operations
 """
+import asyncio
 import boto3
+from contextlib import AsyncExitStack
+from boto3.s3.transfer import TransferConfig
 import os
 from pathlib import Path
 from typing import Optional, BinaryIO
@@ -11,32 +14,101 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    import aioboto3  # optional: natively async S3 calls
+except ImportError:
+    aioboto3 = None
+
+# Audio files above 8 MiB are uploaded as multipart with up to 16 parts in flight
+UPLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    max_concurrency=16,
+    use_threads=True,
+)
+
 class S3Service:
     """Service for handling S3 operations"""
     
     def __init__(self):
         self.s3_client = None
         self.bucket_name = settings.s3_bucket_name
+        self._available = False
+        
+        self._async_session = None
+        self._async_client = None  # shared aioboto3 client, opened by start()
+        self._async_stack: Optional[AsyncExitStack] = None
+        self._client_kwargs = dict(
+            aws_access_key_id=settings.s3_access_key_id,
+            aws_secret_access_key=settings.s3_secret_access_key,
+            region_name=settings.s3_region_name,
+            endpoint_url=settings.s3_endpoint_url
+        )
         
         if settings.use_s3:
             try:
-                self.s3_client = boto3.client(
-                    's3',
-                    aws_access_key_id=settings.s3_access_key_id,
-                    aws_secret_access_key=settings.s3_secret_access_key,
-                    region_name=settings.s3_region_name,
-                    endpoint_url=settings.s3_endpoint_url
-                )
+                self.s3_client = boto3.client('s3', **self._client_kwargs)
                 # Test connection
                 self.s3_client.head_bucket(Bucket=self.bucket_name)
                 logger.info(f"Successfully connected to S3 bucket: {self.bucket_name}")
             except (ClientError, NoCredentialsError) as e:
                 logger.error(f"Failed to initialize S3 client: {e}")
                 self.s3_client = None
+        
+        # Availability is computed once here so is_available() is a plain attribute read
+        self._available = bool(self.s3_client is not None and self.bucket_name)
+        if self._available and aioboto3 is not None:
+            self._async_session = aioboto3.Session()
+    
+    async def start(self) -> None:
+        """
+        Open the aioboto3 client shared by every S3 call in this process. Entering a client
+        loads the service model and creates its connection pool, so it's done once at startup.
+        """
+        if self._async_session is None or self._async_client is not None:
+            return
+        stack = AsyncExitStack()
+        self._async_client = await stack.enter_async_context(
+            self._async_session.client('s3', **self._client_kwargs)
+        )
+        self._async_stack = stack
+    
+    async def close(self) -> None:
+        """Close the shared aioboto3 client opened by start()"""
+        if self._async_stack is not None:
+            stack, self._async_stack, self._async_client = self._async_stack, None, None
+            await stack.aclose()
+    
+    async def _call(self, method: str, *args, **kwargs):
+        """Run an S3 client method natively async on the shared aioboto3 client once started, else in a worker thread"""
+        if self._async_client is not None:
+            return await getattr(self._async_client, method)(*args, **kwargs)
+        return await asyncio.to_thread(getattr(self.s3_client, method), *args, **kwargs)
     
     def is_available(self) -> bool:
-        """Check if S3 is available and configured"""
-        return self.s3_client is not None and self.bucket_name
+        """Check if S3 is available and configured (cached flag, no probe)"""
+        return self._available
+    
+    def refresh_availability(self) -> bool:
+        """
+        Re-probe the bucket and update the cached availability flag, creating the client if
+        it failed at startup. /readyz calls this while S3 is unavailable so a transient
+        startup failure recovers without a restart.
+        """
+        if not self.bucket_name:
+            self._available = False
+            return False
+        try:
+            if self.s3_client is None:
+                self.s3_client = boto3.client('s3', **self._client_kwargs)
+            self.s3_client.head_bucket(Bucket=self.bucket_name)
+            self._available = True
+        except Exception as e:
+            logger.error(f"S3 bucket {self.bucket_name} is not reachable: {e}")
+            self._available = False
+        if self._available and aioboto3 is not None and self._async_session is None:
+            # Calls go through the boto3 thread path until start() opens the async client
+            self._async_session = aioboto3.Session()
+        return self._available
     
     async def upload_file(self, file_path: Path, s3_key: str, content_type: Optional[str] = None) -> bool:
         """Upload a file to S3"""
@@ -49,11 +121,13 @@ class S3Service:
             if content_type:
                 extra_args['ContentType'] = content_type
             
-            self.s3_client.upload_file(
+            await self._call(
+                'upload_file',
                 str(file_path),
                 self.bucket_name,
                 s3_key,
-                ExtraArgs=extra_args
+                ExtraArgs=extra_args,
+                Config=UPLOAD_TRANSFER_CONFIG
             )
             logger.info(f"Successfully uploaded {file_path} to S3 as {s3_key}")
             return True
@@ -72,11 +146,13 @@ class S3Service:
             if content_type:
                 extra_args['ContentType'] = content_type
             
-            self.s3_client.upload_fileobj(
+            await self._call(
+                'upload_fileobj',
                 file_obj,
                 self.bucket_name,
                 s3_key,
-                ExtraArgs=extra_args
+                ExtraArgs=extra_args,
+                Config=UPLOAD_TRANSFER_CONFIG
             )
             logger.info(f"Successfully uploaded file object to S3 as {s3_key}")
             return True
@@ -91,7 +167,8 @@ class S3Service:
             return False
         
         try:
-            self.s3_client.download_file(
+            await self._call(
+                'download_file',
                 self.bucket_name,
                 s3_key,
                 str(local_path)
@@ -109,7 +186,8 @@ class S3Service:
             return False
         
         try:
-            self.s3_client.delete_object(
+            await self._call(
+                'delete_object',
                 Bucket=self.bucket_name,
                 Key=s3_key
             )
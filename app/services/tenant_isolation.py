@@ -2,19 +2,24 @@
 Tenant isolation service for multi-tenant data security
 """
 from typing import Optional, Dict, Any, List
-from sqlalchemy.orm import Session, Query
-from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, Query, undefer_group
+from sqlalchemy import and_, or_, event
 from app.db import models
+from app.crud.notes import commit_keep_loaded
+from app.utils.cache import TTLCache
 from app.utils.logging import logger
 from app.security.audit import AuditManager, AuditAction, AuditSeverity
 
+# Per-tenant statistics are aggregated on every dashboard load; keep them briefly
+_stats_cache = TTLCache(maxsize=1000, ttl=15)
+
 
 class TenantIsolationService:
     """Service for enforcing tenant isolation and data segregation"""
     
     @staticmethod
     def get_user_tenant_id(user: models.User) -> str:
-        """Get the tenant ID for a user"""
+        """Get the tenant ID for a user (reads the already-loaded column, no query)"""
         return user.tenant_id or "default"
     
     @staticmethod
@@ -33,7 +38,8 @@ class TenantIsolationService:
         limit: int = 100
     ) -> List[models.Note]:
         """Get notes for a specific tenant with optional user filter"""
-        query = db.query(models.Note).filter(models.Note.tenant_id == tenant_id)
+        # Returned whole to the caller, so include the deferred body columns
+        query = db.query(models.Note).options(undefer_group("body")).filter(models.Note.tenant_id == tenant_id)
         
         if user_id:
             query = query.filter(models.Note.provider_id == user_id)
@@ -62,11 +68,20 @@ class TenantIsolationService:
         tenant_id: str,
         skip: int = 0, 
         limit: int = 100
-    ) -> List[models.User]:
-        """Get users for a specific tenant"""
-        return db.query(models.User).filter(
+    ) -> List[Dict[str, Any]]:
+        """Get safe user data (no passwords) for a specific tenant as plain dicts"""
+        rows = db.query(
+            models.User.id,
+            models.User.username,
+            models.User.email,
+            models.User.is_active,
+            models.User.is_admin,
+            models.User.role,
+            models.User.last_login
+        ).filter(
             models.User.tenant_id == tenant_id
         ).offset(skip).limit(limit).all()
+        return [row._asdict() for row in rows]
     
     @staticmethod
     def create_note_with_tenant(
@@ -93,8 +108,8 @@ class TenantIsolationService:
         # Create the note
         note = models.Note(**note_data)
         db.add(note)
-        db.commit()
-        db.refresh(note)
+        # Flush populated every column (no server defaults); skip the refresh SELECT
+        commit_keep_loaded(db)
         
         # Log the creation
         AuditManager.log_action(
@@ -128,8 +143,8 @@ class TenantIsolationService:
         # Create the patient
         patient = models.Patient(**patient_data)
         db.add(patient)
-        db.commit()
-        db.refresh(patient)
+        # Flush populated every column (no server defaults); skip the refresh SELECT
+        commit_keep_loaded(db)
         
         # Log the creation
         AuditManager.log_action(
@@ -152,10 +167,12 @@ class TenantIsolationService:
         db: Session,
         user: models.User,
         resource_type: str,
-        resource_id: int
+        resource_id: int,
+        tenant_id: Optional[str] = None
     ) -> bool:
         """Verify that a user has access to a resource within their tenant"""
-        tenant_id = TenantIsolationService.get_user_tenant_id(user)
+        if tenant_id is None:
+            tenant_id = TenantIsolationService.get_user_tenant_id(user)
         
         try:
             if resource_type == "note":
@@ -191,7 +208,10 @@ class TenantIsolationService:
     
     @staticmethod
     def get_tenant_statistics(db: Session, tenant_id: str) -> Dict[str, Any]:
-        """Get statistics for a specific tenant"""
+        """Get statistics for a specific tenant (cached for a few seconds)"""
+        cached = _stats_cache.get(tenant_id)
+        if cached is not None:
+            return dict(cached)
         try:
             # Count resources by tenant
             user_count = db.query(models.User).filter(models.User.tenant_id == tenant_id).count()
@@ -206,13 +226,15 @@ class TenantIsolationService:
                 models.User.last_login >= thirty_days_ago
             ).count()
             
-            return {
+            stats = {
                 "tenant_id": tenant_id,
                 "user_count": user_count,
                 "patient_count": patient_count,
                 "note_count": note_count,
                 "active_user_count": active_user_count
             }
+            _stats_cache.set(tenant_id, stats)
+            return dict(stats)
             
         except Exception as e:
             logger.error(f"Error getting tenant statistics: {str(e)}")
@@ -224,6 +246,11 @@ class TenantIsolationService:
                 "active_user_count": 0
             }
     
+    @staticmethod
+    def invalidate_tenant_statistics(tenant_id: Optional[str]) -> None:
+        """Drop cached statistics for a tenant after its data changes"""
+        _stats_cache.pop(tenant_id or "default", None)
+    
     @staticmethod
     def migrate_user_to_tenant(
         db: Session,
@@ -255,6 +282,8 @@ class TenantIsolationService:
             ).update({"tenant_id": new_tenant_id})
             
             db.commit()
+            TenantIsolationService.invalidate_tenant_statistics(old_tenant_id)
+            TenantIsolationService.invalidate_tenant_statistics(new_tenant_id)
             
             # Log the migration
             AuditManager.log_action(
@@ -286,7 +315,7 @@ class TenantIsolationService:
             # Verify admin user exists and is admin
             admin_user = db.query(models.User).filter(
                 models.User.id == admin_user_id,
-                models.User.is_admin == 1
+                models.User.is_admin.is_(True)
             ).first()
             
             if not admin_user:
@@ -299,3 +328,13 @@ class TenantIsolationService:
         except Exception as e:
             logger.error(f"Error getting tenant list: {str(e)}")
             return []
+
+
+def _invalidate_statistics_for(mapper, connection, target) -> None:
+    TenantIsolationService.invalidate_tenant_statistics(getattr(target, "tenant_id", None))
+
+
+# Any note/patient/user insert or delete changes the counts, whichever code path made it
+for _model in (models.Note, models.Patient, models.User):
+    event.listen(_model, "after_insert", _invalidate_statistics_for)
+    event.listen(_model, "after_delete", _invalidate_statistics_for)
@@ -2,10 +2,16 @@
 transcription.py: Placeholder for audio transcription service (e.g., Whisper).
 """
 from pathlib import Path
+from typing import BinaryIO, List, Tuple, Union
+import asyncio
 import logging
+import subprocess
 
 logger = logging.getLogger(__name__)
 
+# (start, end, text) of one recognised word, times in seconds
+Word = Tuple[float, float, str]
+
 class TranscriptionService:
     def __init__(self, model_size: str = None):
         """
@@ -38,21 +44,64 @@ class TranscriptionService:
                     logger.error(f"Failed to load base model as fallback: {fallback_error}")
                     raise Exception(f"Failed to load any Whisper model: {str(e)}")
 
-    async def transcribe(self, audio_path: Path) -> str:
+    @staticmethod
+    def _decode_audio(audio_bytes: bytes, sample_rate: int = 16000):
+        """
+        Decode in-memory audio to 16 kHz mono float32 samples.
+        Mirrors whisper.load_audio, but feeds ffmpeg through stdin instead of a file path.
+        """
+        import numpy as np  # whisper dependency; imported lazily like whisper itself
+
+        cmd = [
+            "ffmpeg", "-threads", "0", "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate),
+            "-"
+        ]
+        try:
+            out = subprocess.run(cmd, input=audio_bytes, capture_output=True, check=True).stdout
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+        return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+    async def transcribe(self, audio: Union[Path, BinaryIO]) -> str:
         """
-        Transcribe an audio file using the loaded Whisper model.
+        Transcribe audio using the loaded Whisper model.
         
         Args:
-            audio_path: Path to the audio file to transcribe
+            audio: Path to the audio file, or a file-like object holding the encoded audio
             
         Returns:
             Transcribed text
         """
+        if hasattr(audio, "read"):
+            try:
+                logger.info("Transcribing in-memory audio")
+                # Decode straight from memory; no temp file round-trip
+                samples = await asyncio.to_thread(self._decode_audio, audio.read())
+            except Exception as e:
+                logger.error(f"Transcription failed: {e}")
+                raise Exception(f"Transcription failed: {str(e)}")
+            return await self.transcribe_array(samples)
+        logger.info(f"Transcribing audio file: {audio}")
+        return await self._run_whisper(str(audio))
+
+    async def transcribe_array(self, samples) -> str:
+        """
+        Transcribe already-decoded audio.
+        
+        Args:
+            samples: 16 kHz mono float32 numpy array in [-1, 1]
+            
+        Returns:
+            Transcribed text
+        """
+        return await self._run_whisper(samples)
+
+    async def _run_whisper(self, whisper_input) -> str:
         try:
-            self._load_model()
-            logger.info(f"Transcribing audio file: {audio_path}")
-            # Use Whisper to transcribe the audio file
-            result = self.model.transcribe(str(audio_path))
+            # Model loading and inference block, so run them in a worker thread
+            await asyncio.to_thread(self._load_model)
+            result = await asyncio.to_thread(self.model.transcribe, whisper_input)
             transcript = result["text"].strip()
             logger.info(f"Transcription completed: {len(transcript)} characters")
             
@@ -88,5 +137,132 @@ class TranscriptionService:
             logger.error(f"Chunk transcription failed: {e}")
             raise Exception(f"Chunk transcription failed: {str(e)}")
 
+    async def transcribe_words(self, pcm_bytes: bytes, prompt: str = "") -> List[Word]:
+        """
+        Transcribe a block of raw 16 kHz, 16-bit little-endian mono PCM with word timestamps.
+        Inference runs in a worker thread so the event loop keeps receiving audio.
+        Args:
+            pcm_bytes: Raw PCM samples
+            prompt: Previously committed text, passed to Whisper as context
+        Returns:
+            (start, end, word) tuples, with times in seconds relative to the block start
+        """
+        try:
+            await asyncio.to_thread(self._load_model)
+            import numpy as np  # whisper dependency; imported lazily like whisper itself
+            audio = np.frombuffer(pcm_bytes, np.int16).astype(np.float32) / 32768.0
+            result = await asyncio.to_thread(
+                self.model.transcribe,
+                audio,
+                word_timestamps=True,
+                initial_prompt=prompt or None,
+                condition_on_previous_text=False,
+            )
+            return [
+                (word["start"], word["end"], word["word"].strip())
+                for segment in result["segments"]
+                for word in segment.get("words", [])
+            ]
+        except Exception as e:
+            logger.error(f"PCM block transcription failed: {e}")
+            raise Exception(f"PCM block transcription failed: {str(e)}")
+
+
+def _normalize_word(word: str) -> str:
+    return word.lower().strip(".,!?;:\"'")
+
+
+class StreamingTranscriber:
+    """
+    Live transcription over a rolling PCM buffer using the LocalAgreement-2 policy
+    from Whisper-Streaming: the whole buffer is re-transcribed every min_chunk_seconds
+    of new audio, and a word is only committed once two consecutive hypotheses agree on it.
+    Committed audio is trimmed from the buffer so each pass stays bounded.
+    """
+
+    def __init__(
+        self,
+        service: "TranscriptionService",
+        sample_rate: int = 16000,
+        min_chunk_seconds: float = 1.0,
+        buffer_trim_seconds: float = 15.0,
+        max_buffer_seconds: float = 30.0,
+    ):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.bytes_per_second = sample_rate * 2
+        self.min_chunk_bytes = int(min_chunk_seconds * self.bytes_per_second)
+        self.buffer_trim_seconds = buffer_trim_seconds
+        self.max_buffer_seconds = max_buffer_seconds
+        self.audio = bytearray()
+        self.buffer_offset = 0.0  # absolute stream time (s) of audio[0]
+        self.pending_bytes = 0  # audio received since the last pass
+        self.committed: List[Word] = []
+        self.hypothesis: List[Word] = []  # unconfirmed tail of the previous pass
+
+    def insert_audio(self, pcm_bytes: bytes) -> None:
+        self.audio.extend(pcm_bytes)
+        self.pending_bytes += len(pcm_bytes)
+
+    def ready(self) -> bool:
+        """True once enough new audio has arrived to justify another Whisper pass"""
+        return self.pending_bytes >= self.min_chunk_bytes
+
+    @property
+    def text(self) -> str:
+        return " ".join(word for _, _, word in self.committed)
+
+    async def process(self) -> str:
+        """Re-transcribe the buffer and return the words newly committed by this pass"""
+        self.pending_bytes = 0
+        prompt = self.text[-200:]
+        words = await self.service.transcribe_words(bytes(self.audio), prompt)
+        offset = self.buffer_offset
+        confirmed = self.agree([(start + offset, end + offset, word) for start, end, word in words])
+        self._trim()
+        return " ".join(word for _, _, word in confirmed)
+
+    def agree(self, words: List[Word]) -> List[Word]:
+        """Commit the longest prefix shared by the previous and the new hypothesis"""
+        last_end = self.committed[-1][1] if self.committed else 0.0
+        new = [w for w in words if w[0] > last_end - 0.1]
+        # Whisper often repeats the last committed words at the start of the buffer; drop 1-5 gram overlaps
+        if new and self.committed and abs(new[0][0] - last_end) < 1.0:
+            for n in range(min(5, len(self.committed), len(new)), 0, -1):
+                tail = [_normalize_word(w[2]) for w in self.committed[-n:]]
+                head = [_normalize_word(w[2]) for w in new[:n]]
+                if tail == head:
+                    new = new[n:]
+                    break
+        confirmed = []
+        for previous, current in zip(self.hypothesis, new):
+            if _normalize_word(previous[2]) != _normalize_word(current[2]):
+                break
+            confirmed.append(current)
+        self.committed.extend(confirmed)
+        self.hypothesis = new[len(confirmed):]
+        return confirmed
+
+    def finish(self) -> str:
+        """Commit whatever is still unconfirmed when the stream ends"""
+        remaining, self.hypothesis = self.hypothesis, []
+        self.committed.extend(remaining)
+        return " ".join(word for _, _, word in remaining)
+
+    def _trim(self) -> None:
+        duration = len(self.audio) / self.bytes_per_second
+        if duration <= self.buffer_trim_seconds:
+            return
+        cut = self.committed[-1][1] - self.buffer_offset if self.committed else 0.0
+        if duration > self.max_buffer_seconds:
+            # Nothing stable enough to commit; bound the buffer anyway
+            cut = max(cut, duration - self.buffer_trim_seconds)
+        cut_bytes = int(cut * self.sample_rate) * 2
+        if cut_bytes <= 0:
+            return
+        del self.audio[:cut_bytes]
+        self.buffer_offset += cut_bytes / self.bytes_per_second
+        self.hypothesis = [w for w in self.hypothesis if w[1] > self.buffer_offset]
+
 # Singleton instance
 transcription_service = TranscriptionService()
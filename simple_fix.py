@@ -38,8 +38,8 @@ def fix_database_simple():
                     username VARCHAR UNIQUE NOT NULL,
                     hashed_password VARCHAR NOT NULL,
                     email VARCHAR UNIQUE NOT NULL,
-                    is_active INTEGER DEFAULT 1,
-                    is_admin INTEGER DEFAULT 0,
+                    is_active BOOLEAN DEFAULT TRUE,
+                    is_admin BOOLEAN DEFAULT FALSE,
                     role VARCHAR DEFAULT 'provider',
                     last_login TIMESTAMP WITH TIME ZONE,
                     failed_login_attempts INTEGER DEFAULT 0,
@@ -65,7 +65,7 @@ def fix_database_simple():
             
             conn.execute(text("""
                 INSERT INTO users (username, hashed_password, email, is_active, is_admin)
-                VALUES ('testuser', :hashed_password, 'test@example.com', 1, 0)
+                VALUES ('testuser', :hashed_password, 'test@example.com', TRUE, FALSE)
                 ON CONFLICT (username) DO NOTHING;
             """), {"hashed_password": hashed})
             
@@ -6,4 +6,4 @@ export PORT=${PORT:-8000}
 echo "Starting Scribsy backend on port $PORT"
 
 # Start the application with proper port handling
-exec uvicorn app.main:app --host 0.0.0.0 --port $PORT
+exec uvicorn app.main:app --host 0.0.0.0 --port $PORT --loop uvloop --http httptools
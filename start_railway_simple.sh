@@ -2,7 +2,11 @@
 
 echo "Starting Scribsy backend on Railway (Simple Mode)..."
 
-# Start the application directly without database initialization
+# Create tables/indexes and apply the startup migrations once, not in every worker
+echo "Initializing database schema..."
+python -c "from app.db.database import init_db; init_db()" || echo "Schema init failed; continuing"
+export DB_MIGRATE_ON_STARTUP=false
+
 echo "Starting gunicorn server..."
 exec gunicorn -k uvicorn.workers.UvicornWorker app.main:app --bind 0.0.0.0:$PORT --workers ${WEB_CONCURRENCY:-2} --timeout ${WEB_TIMEOUT:-60}
 
@@ -0,0 +1,105 @@
+import uuid
+from datetime import date
+
+from app.main import app  # noqa: F401  (imports every model before the session is used)
+from app.crud import notes as crud_notes
+from app.crud import patients as crud_patients
+from app.db import models, schemas
+from app.db.database import SessionLocal
+
+
+def test_bulk_create_numbers_visits_per_patient_in_input_order() -> None:
+    db = SessionLocal()
+    unique = uuid.uuid4().hex[:10]
+    user = models.User(username=f"bulk_{unique}", email=f"{unique}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    try:
+        patient_ids = crud_patients.create_patients_bulk(db, [
+            schemas.PatientCreate(user_id=user.id, first_name=name, last_name="Bulk", date_of_birth=date(1990, 1, 1))
+            for name in ("Ann", "Ben")
+        ])
+        assert len(patient_ids) == 2
+        ann, ben = patient_ids
+        assert db.get(models.Patient, ann).first_name == "Ann"
+
+        def note(patient_id, visit_id=None):
+            return schemas.NoteCreate(
+                patient_id=patient_id, provider_id=user.id, visit_id=visit_id,
+                note_type="Progress", content="bulk", status="draft",
+            )
+
+        note_ids = crud_notes.create_notes_bulk(db, [note(ann), note(ben), note(ann), note(ben, visit_id=7)])
+        visits = [db.get(models.Note, note_id).visit_id for note_id in note_ids]
+        assert visits == [1, 1, 2, 7]
+        assert crud_notes.create_notes_bulk(db, []) == []
+    finally:
+        db.query(models.Note).filter(models.Note.provider_id == user.id).delete()
+        db.query(models.Patient).filter(models.Patient.user_id == user.id).delete()
+        db.delete(user)
+        db.commit()
+        db.close()
+
+
+def test_note_sidecar_rows_insert_in_one_statement() -> None:
+    db = SessionLocal()
+    unique = uuid.uuid4().hex[:10]
+    user = models.User(username=f"sidecar_{unique}", email=f"{unique}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    try:
+        (patient_id,) = crud_patients.create_patients_bulk(db, [
+            schemas.PatientCreate(user_id=user.id, first_name="Cy", last_name="Side", date_of_birth=date(1990, 1, 1))
+        ])
+        (note_id,) = crud_notes.create_notes_bulk(db, [schemas.NoteCreate(
+            patient_id=patient_id, provider_id=user.id, note_type="Progress", content="c", status="draft",
+        )])
+
+        provenance_ids = crud_notes.add_note_provenance(db, note_id, [
+            {"section": "plan", "sentence_index": index, "text": f"sentence {index}"} for index in range(3)
+        ])
+        code_ids = crud_notes.add_note_codes(db, note_id, [
+            {"system": "ICD10", "code": "J06.9"}, {"system": "CPT", "code": "99213"},
+        ])
+
+        assert [db.get(models.NoteProvenance, row_id).sentence_index for row_id in provenance_ids] == [0, 1, 2]
+        assert [db.get(models.NoteCodeExtraction, row_id).code for row_id in code_ids] == ["J06.9", "99213"]
+        assert db.get(models.NoteCodeExtraction, code_ids[0]).status == "suggested"
+        assert crud_notes.add_note_codes(db, note_id, []) == []
+    finally:
+        note = db.get(models.Note, note_id)
+        db.delete(note)  # cascades to provenance and codes
+        db.query(models.Patient).filter(models.Patient.user_id == user.id).delete()
+        db.delete(user)
+        db.commit()
+        db.close()
+
+
+def test_returning_inserts_invalidate_tenant_statistics() -> None:
+    from app.services.tenant_isolation import TenantIsolationService, _stats_cache
+
+    db = SessionLocal()
+    unique = uuid.uuid4().hex[:10]
+    tenant_id = f"tenant_{unique}"
+    user = models.User(username=f"stats_{unique}", email=f"{unique}@example.com", hashed_password="x", tenant_id=tenant_id)
+    db.add(user)
+    db.commit()
+    try:
+        assert TenantIsolationService.get_tenant_statistics(db, tenant_id)["patient_count"] == 0
+        (patient_id,) = crud_patients.create_patients_bulk(db, [schemas.PatientCreate(
+            user_id=user.id, first_name="Sta", last_name="Ts", date_of_birth=date(1990, 1, 1), tenant_id=tenant_id,
+        )])
+        assert _stats_cache.get(tenant_id) is None
+
+        assert TenantIsolationService.get_tenant_statistics(db, tenant_id)["note_count"] == 0
+        crud_notes.create_note(db, schemas.NoteCreate(
+            patient_id=patient_id, provider_id=user.id, note_type="Progress", content="s", status="draft",
+            tenant_id=tenant_id,
+        ))
+        assert TenantIsolationService.get_tenant_statistics(db, tenant_id)["note_count"] == 1
+    finally:
+        db.query(models.Note).filter(models.Note.provider_id == user.id).delete()
+        db.query(models.Patient).filter(models.Patient.user_id == user.id).delete()
+        db.delete(user)
+        db.commit()
+        db.close()
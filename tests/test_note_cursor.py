@@ -0,0 +1,65 @@
+import re
+import uuid
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.api.endpoints.notes import _decode_note_cursor, _encode_note_cursor
+from app.crud import notes as crud_notes
+from app.crud import patients as crud_patients
+from app.db import models, schemas
+from app.db.database import SessionLocal
+
+
+def test_cursor_survives_an_unencoded_query_string() -> None:
+    created_at = datetime(2025, 3, 1, 9, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = _encode_note_cursor(SimpleNamespace(id=42, created_at=created_at))
+
+    assert re.fullmatch(r"[A-Za-z0-9_-]+", cursor)
+    (echoed,) = parse_qs(f"cursor={cursor}")["cursor"]
+    assert _decode_note_cursor(echoed) == (created_at, 42)
+
+
+def test_note_list_pages_through_the_next_cursor() -> None:
+    client = TestClient(app)
+    unique = uuid.uuid4().hex[:10]
+    username, email, password = f"cursor_{unique}", f"{unique}@example.com", "pass1234"
+    assert client.post("/auth/register", json={"username": username, "email": email, "password": password}).status_code == 200
+    token = client.post(
+        "/auth/token",
+        data={"username": username, "password": password},
+        headers={"content-type": "application/x-www-form-urlencoded"},
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    db = SessionLocal()
+    user = db.query(models.User).filter(models.User.email == email).one()
+    try:
+        (patient_id,) = crud_patients.create_patients_bulk(db, [
+            schemas.PatientCreate(user_id=user.id, first_name="Cur", last_name="Sor", date_of_birth=date(1990, 1, 1))
+        ])
+        note_ids = crud_notes.create_notes_bulk(db, [
+            schemas.NoteCreate(patient_id=patient_id, provider_id=user.id, note_type="Progress", content=str(n), status="draft")
+            for n in range(3)
+        ])
+
+        seen, cursor = [], None
+        while True:
+            # The cursor is pasted into the URL as-is, the way most clients echo it back
+            response = client.get("/notes/?limit=2" + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+            assert response.status_code == 200, response.text
+            seen += [note["id"] for note in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert sorted(seen) == sorted(note_ids)
+        assert client.get("/notes/?cursor=not-a-cursor", headers=headers).status_code == 400
+    finally:
+        db.query(models.Note).filter(models.Note.provider_id == user.id).delete()
+        db.query(models.Patient).filter(models.Patient.user_id == user.id).delete()
+        db.delete(user)
+        db.commit()
+        db.close()
@@ -0,0 +1,53 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import event
+
+from app.main import app  # noqa: F401  (imports every model before the session is used)
+from app.crud import notes as crud_notes
+from app.crud import patients as crud_patients
+from app.db import models, schemas
+from app.db.database import SessionLocal, engine
+
+BODY_FIELDS = (
+    "content", "transcript", "soap_subjective", "soap_objective",
+    "soap_assessment", "soap_plan", "original_content",
+)
+
+
+def test_create_and_update_return_body_columns_without_a_reload() -> None:
+    db = SessionLocal()
+    unique = uuid.uuid4().hex[:10]
+    user = models.User(username=f"returning_{unique}", email=f"{unique}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    (patient_id,) = crud_patients.create_patients_bulk(db, [
+        schemas.PatientCreate(user_id=user.id, first_name="Ret", last_name="Urning", date_of_birth=date(1990, 1, 1))
+    ])
+    provider_id = user.id
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        note = crud_notes.create_note(db, schemas.NoteCreate(
+            patient_id=patient_id, provider_id=provider_id, note_type="Progress", content="created", status="draft",
+        ))
+        assert {field: getattr(note, field) for field in BODY_FIELDS}["content"] == "created"
+        assert not any(statement.startswith("SELECT") for statement in statements)
+
+        statements.clear()
+        with SessionLocal() as fresh:
+            updated = crud_notes.update_note(fresh, note.id, schemas.NoteUpdate(soap_plan="rest"))
+            body = {field: getattr(updated, field) for field in BODY_FIELDS}
+        assert (body["content"], body["soap_plan"]) == ("created", "rest")
+        assert not any(statement.startswith("SELECT") for statement in statements)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+        db.query(models.Note).filter(models.Note.provider_id == user.id).delete()
+        db.query(models.Patient).filter(models.Patient.user_id == user.id).delete()
+        db.delete(user)
+        db.commit()
+        db.close()
@@ -0,0 +1,21 @@
+from app.crud import notes as crud_notes
+
+
+def test_hash_passwords_bulk_preserves_order() -> None:
+    passwords = ["alpha-1", "bravo-2", "charlie-3"]
+    hashes = crud_notes.hash_passwords_bulk(passwords)
+
+    assert len(hashes) == len(passwords)
+    for password, hashed in zip(passwords, hashes):
+        assert crud_notes.verify_password(password, hashed)
+    assert not crud_notes.verify_password(passwords[0], hashes[1])
+
+
+def test_api_key_hashes_verify_through_verify_password() -> None:
+    stored = crud_notes.hash_api_key("generated-key")
+
+    assert stored.startswith("hmac$")
+    assert crud_notes.verify_api_key("generated-key", stored)
+    assert crud_notes.verify_password("generated-key", stored)
+    assert not crud_notes.verify_password("other-key", stored)
+    assert not crud_notes.verify_api_key("generated-key", crud_notes.get_password_hash("generated-key"))
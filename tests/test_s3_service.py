@@ -0,0 +1,70 @@
+import asyncio
+
+from app.services.s3_service import S3Service
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+
+    async def delete_object(self, **kwargs):
+        self.calls.append(kwargs)
+
+
+class FakeSession:
+    """Stands in for aioboto3.Session; counts how many clients get built"""
+
+    def __init__(self):
+        self.clients = []
+
+    def client(self, service_name, **kwargs):
+        assert service_name == "s3"
+        self.clients.append(FakeClient())
+        return self.clients[-1]
+
+
+def test_async_calls_share_one_client_opened_at_start() -> None:
+    service = S3Service()
+    service._async_session = FakeSession()
+    service.bucket_name = "bucket"
+
+    async def run():
+        await service.start()
+        await service.start()  # idempotent
+        for key in ("a", "b", "c"):
+            await service._call("delete_object", Bucket=service.bucket_name, Key=key)
+        await service.close()
+
+    asyncio.run(run())
+
+    (client,) = service._async_session.clients
+    assert [call["Key"] for call in client.calls] == ["a", "b", "c"]
+    assert client.closed
+    assert service._async_client is None
+
+
+def test_refresh_availability_recovers_after_a_failed_probe() -> None:
+    class FlakyClient:
+        def __init__(self):
+            self.reachable = False
+
+        def head_bucket(self, Bucket):
+            if not self.reachable:
+                raise ConnectionError("bucket unreachable")
+
+    service = S3Service()
+    service.s3_client = FlakyClient()
+    service.bucket_name = "bucket"
+
+    assert service.refresh_availability() is False
+    assert not service.is_available()
+    service.s3_client.reachable = True
+    assert service.refresh_availability() is True
+    assert service.is_available()
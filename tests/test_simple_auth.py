@@ -0,0 +1,28 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def test_simple_login_accepts_hashed_credentials() -> None:
+    client = TestClient(app)
+
+    for _ in range(2):  # second call is served from the verification cache
+        resp = client.post(
+            "/simple-login",
+            data={"username": "testuser", "password": "testpass123"},
+            headers={"content-type": "application/x-www-form-urlencoded"},
+        )
+        assert resp.status_code == 200, resp.text
+        assert resp.json()["user"]["username"] == "testuser"
+
+
+def test_simple_login_rejects_bad_credentials() -> None:
+    client = TestClient(app)
+
+    for username, password in (("testuser", "wrong"), ("nobody", "testpass123")):
+        resp = client.post(
+            "/simple-login",
+            data={"username": username, "password": password},
+            headers={"content-type": "application/x-www-form-urlencoded"},
+        )
+        assert resp.status_code == 401, resp.text
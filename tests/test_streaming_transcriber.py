@@ -0,0 +1,80 @@
+import asyncio
+
+from app.services.transcription import StreamingTranscriber
+
+
+class FakeService:
+    """Returns one scripted hypothesis per Whisper pass"""
+
+    def __init__(self, passes):
+        self.passes = list(passes)
+
+    async def transcribe_words(self, pcm_bytes, prompt=""):
+        return self.passes.pop(0)
+
+
+def test_local_agreement_commits_only_repeated_prefix() -> None:
+    service = FakeService([
+        [(0.0, 0.4, "the"), (0.4, 0.9, "patient")],
+        [(0.0, 0.4, "The"), (0.4, 0.9, "patient"), (0.9, 1.5, "reports")],
+        [(0.0, 0.4, "the"), (0.4, 0.9, "patient"), (0.9, 1.5, "reports"), (1.5, 2.0, "pain.")],
+    ])
+    streamer = StreamingTranscriber(service, min_chunk_seconds=1.0)
+
+    async def run():
+        results = []
+        for _ in range(3):
+            streamer.insert_audio(b"\x00\x00" * 16000)
+            assert streamer.ready()
+            results.append(await streamer.process())
+        return results
+
+    assert asyncio.run(run()) == ["", "The patient", "reports"]
+    assert streamer.finish() == "pain."
+    assert streamer.text == "The patient reports pain."
+
+
+def test_trim_drops_committed_audio_from_buffer() -> None:
+    streamer = StreamingTranscriber(FakeService([]), buffer_trim_seconds=2.0)
+    streamer.insert_audio(b"\x00\x00" * 16000 * 3)
+    streamer.committed = [(0.0, 1.5, "hello")]
+    streamer._trim()
+
+    assert streamer.buffer_offset == 1.5
+    assert len(streamer.audio) == 16000 * 2 * 3 - 48000
+
+
+def test_live_transcribe_rejects_unsupported_audio_format() -> None:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app).websocket_connect("/ws/live-transcribe") as ws:
+        ws.send_json({"sample_rate": 44100, "channels": 2, "encoding": "pcm_f32le"})
+        reply = ws.receive_json()
+
+    assert reply["error"] == "Unsupported audio format"
+    assert reply["expected"]["sample_rate"] == 16000
+
+
+def test_live_transcribe_closes_when_whisper_pass_fails(monkeypatch) -> None:
+    from fastapi.testclient import TestClient
+
+    from app.api.endpoints import transcribe
+    from app.main import app
+
+    class FailingService:
+        async def transcribe_words(self, pcm_bytes, prompt=""):
+            raise RuntimeError("whisper crashed")
+
+    monkeypatch.setattr(transcribe, "transcription_service", FailingService())
+    second = b"\x00\x00" * 16000
+
+    with TestClient(app).websocket_connect("/ws/live-transcribe") as ws:
+        ws.send_bytes(second)  # enough audio for one pass, which raises
+        ws.send_bytes(second)
+        reply = ws.receive_json()
+        closed = ws.receive()
+
+    assert reply["error"] == "Live transcription failed"
+    assert closed == {"type": "websocket.close", "code": 1011, "reason": ""}